@@ -0,0 +1,91 @@
+"""Compares the TinyDB, SQLite and journal storages with 10k feeds.
+
+The storages are called directly, without the write window of `Database`,
+so every change costs one write of the storage and the numbers compare the
+storages themselves. "batched upsert" applies all changes with a single
+write, like `Database` does for the changes of one window.
+
+Run from the repository root, the databases are created in a temporary
+directory:
+
+    python -m bench.database
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+FEEDS = 10000
+OPERATIONS = 200
+
+
+def feed(i: int) -> dict:
+    return {
+        "username": f"user{i}",
+        "userid": i,
+        "channel": str(100000 + i % 500),
+        "type": str(i % 3),
+    }
+
+
+def state(i: int) -> dict:
+    return {**feed(i), "watermark": i, "processed": []}
+
+
+def run(name: str, storage) -> None:
+    results = {}
+
+    start = time.perf_counter()
+    storage.batch([("feed_insert", ([feed(i) for i in range(FEEDS)],))])
+    results["bulk insert"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(FEEDS, FEEDS + OPERATIONS):
+        storage.batch([("feed_insert", ([feed(i)],))])
+    results["insert"] = (time.perf_counter() - start) / OPERATIONS
+
+    start = time.perf_counter()
+    for i in range(OPERATIONS):
+        storage.batch([("state_upsert", ([state(i)],))])
+    results["state upsert"] = (time.perf_counter() - start) / OPERATIONS
+
+    start = time.perf_counter()
+    storage.batch(
+        [("state_upsert", ([state(i)],)) for i in range(OPERATIONS, 2 * OPERATIONS)]
+    )
+    results["batched upsert"] = (time.perf_counter() - start) / OPERATIONS
+
+    start = time.perf_counter()
+    for i in range(OPERATIONS):
+        storage.batch([("feed_remove", (feed(i),))])
+    results["remove"] = (time.perf_counter() - start) / OPERATIONS
+
+    start = time.perf_counter()
+    storage.feed_get()
+    results["load all"] = time.perf_counter() - start
+
+    storage.close()
+
+    print(
+        f"{name:>7}: "
+        + " | ".join(f"{k} {v * 1000:8.2f} ms" for k, v in results.items())
+    )
+
+
+def main() -> None:
+    from cogs.api.database import JournalStorage, SQLiteStorage, TinyDBStorage
+
+    run("tinydb", TinyDBStorage("tmp/bench.json"))
+    run("sqlite", SQLiteStorage("tmp/bench.db"))
+    run("journal", JournalStorage("tmp/bench"))
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.getcwd())
+
+    with tempfile.TemporaryDirectory() as path:
+        os.chdir(path)
+        os.makedirs("tmp")
+
+        main()
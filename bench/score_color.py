@@ -0,0 +1,61 @@
+"""Compares the score colour lookup with and without the cached palette.
+
+Run from the repository root:
+
+    python -m bench.score_color
+"""
+
+import random
+import timeit
+from types import SimpleNamespace
+
+from cogs.utils import color_band, in_range, rotate_hue
+from cogs.api.types import CListActivity
+
+NUMBER = 20000
+
+
+def score_color_uncached(user, score: int):
+    amount = 5
+    colors = []
+    for step in range(amount):
+        colors.append(rotate_hue(user.profile_color, (step + 1) / amount * 75))
+    colors.reverse()
+
+    delta = 100 / amount
+
+    for i in range(amount):
+        range_min = 0 + i * delta
+        range_max = range_min + delta
+
+        if in_range(score, range_min, range_max):
+            return colors[i]
+
+    return colors[0]
+
+
+def main() -> None:
+    user = SimpleNamespace(profile_color=(61, 180, 242))
+    scores = [random.randint(0, 100) for _ in range(NUMBER)]
+
+    for score in range(0, 101):
+        assert score_color_uncached(user, score) == CListActivity.get_score_color(
+            user, score
+        ), score
+
+    before = timeit.timeit(
+        lambda: [score_color_uncached(user, s) for s in scores], number=1
+    )
+
+    color_band.cache_clear()
+    after = timeit.timeit(
+        lambda: [CListActivity.get_score_color(user, s) for s in scores], number=1
+    )
+
+    print(f"uncached: {before / NUMBER * 1e6:.2f} us per embed")
+    print(f"cached:   {after / NUMBER * 1e6:.2f} us per embed")
+    print(f"speedup:  {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
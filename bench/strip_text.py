@@ -0,0 +1,87 @@
+"""Compares description stripping with strip_tags and truncate_html.
+
+The output of truncate_html is checked against strip_tags first.
+
+Run from the repository root:
+
+    python -m bench.strip_text
+"""
+
+import random
+import timeit
+
+from cogs.utils import strip_tags, truncate_html
+
+NUMBER = 2000
+SIZES = (256, 2048, 16384)
+
+FRAGMENTS = (
+    "The story follows ",
+    "<i>a young swordsman</i> ",
+    "who travels &amp; fights ",
+    "<br><br>\n",
+    "&quot;demons&quot; ",
+    "<b>across the land</b>. ",
+    "(Source: Wikipedia) ",
+    "I <3 it, a < b ",
+    "Tom &amp Jerry ",
+)
+
+# text that is easy to mistake for markup, must come out like strip_tags
+CASES = (
+    "I <3 this show, it is great.<br><br>Season 2 is coming.",
+    "a < b and c > d",
+    "Tom &amp Jerry &amp; &lt;3 &#39;quoted&#39; &copy 2020",
+    "<i>italic</i><!-- comment -->text</b>",
+    "<!-- a > b -->text",
+    "<a href='x>y'>link</a>",
+    '<a title="1 > 0">link</a>',
+)
+
+
+def description(size: int) -> str:
+    parts = []
+    while sum(map(len, parts)) < size:
+        parts.append(random.choice(FRAGMENTS))
+
+    return "".join(parts)
+
+
+def before(text: str) -> str:
+    # what the media embeds did before
+    return strip_tags(text[:128]) + ("..." if len(strip_tags(text)) > 128 else "")
+
+
+def check() -> None:
+    for text in CASES:
+        expected = strip_tags(text)
+        result = truncate_html(text, size=len(text))
+        assert result == expected, f"{text!r}: {result!r} != {expected!r}"
+
+
+def main() -> None:
+    check()
+
+    for size in SIZES:
+        texts = [description(size) for _ in range(50)]
+
+        old = timeit.timeit(lambda: [before(t) for t in texts], number=NUMBER // 50)
+
+        truncate_html.cache_clear()
+        new = timeit.timeit(
+            lambda: [truncate_html.__wrapped__(t) for t in texts], number=NUMBER // 50
+        )
+
+        cached = timeit.timeit(
+            lambda: [truncate_html(t) for t in texts], number=NUMBER // 50
+        )
+
+        print(
+            f"{size:>6} chars: strip_tags {old / NUMBER * 1e6:8.2f} us"
+            f" | single pass {new / NUMBER * 1e6:6.2f} us"
+            f" | cached {cached / NUMBER * 1e6:5.2f} us"
+        )
+
+
+if __name__ == "__main__":
+    main()
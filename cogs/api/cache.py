@@ -0,0 +1,192 @@
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+from ..utils import *
+from .flight import SingleFlight
+
+
+class TTLCache:
+    """Size bounded mapping with per-entry expiry and LRU eviction.
+
+    Args:
+        maxsize (int): Maximum amount of entries
+        ttl (float): Seconds until an entry expires
+
+    Attributes:
+        maxsize (int): Maximum amount of entries
+        ttl (float): Seconds until an entry expires
+        hits (int): Lookups that found a fresh entry
+        misses (int): Lookups that found nothing or an expired entry
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float = 600) -> None:
+        self.maxsize = max(1, maxsize)
+        self.ttl = ttl
+
+        self.hits = 0
+        self.misses = 0
+
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key)
+
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._data[key]
+
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: float = None) -> None:
+        self._data[key] = (time.monotonic() + (ttl or self.ttl), value)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.pop(key, None)
+        return entry[1] if entry else default
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class ProfileCache:
+    """AniList user profiles keyed by user id and username.
+
+    Args:
+        maxsize (int): Maximum amount of profiles
+        ttl (float): Seconds until a profile is fetched again
+
+    Attributes:
+        cache (TTLCache): Underlying cache, every profile is stored under its id
+            and its lowercase name
+    """
+
+    def __init__(self, maxsize: int = 512, ttl: float = 600) -> None:
+        self.cache = TTLCache(maxsize * 2, ttl)
+
+    @property
+    def hits(self) -> int:
+        return self.cache.hits
+
+    @property
+    def misses(self) -> int:
+        return self.cache.misses
+
+    def set(self, profile: Any) -> None:
+        """Stores a profile under its id and name.
+
+        Args:
+            profile (User): AniList user profile
+        """
+
+        self.cache.set(("id", profile.id), profile)
+        self.cache.set(("name", profile.name.lower()), profile)
+
+    async def get(self, client, name: str = None, userid: int = None) -> Optional[Any]:
+        """Returns a cached profile or fetches it by name.
+
+        Args:
+            client (RateLimitedClient): AniList client
+            name (str): Username. Defaults to None.
+            userid (int): User id, only used for lookups in the cache if no
+                name is given. Defaults to None.
+
+        Returns:
+            Optional[User]: AniList user profile
+        """
+
+        profile = self.cache.get(("name", name.lower()) if name else ("id", userid))
+
+        if profile or not name:
+            return profile
+
+        profile = await client.get_user(name=name)
+        if profile:
+            self.set(profile)
+
+        return profile
+
+
+class ListItemCache:
+    """Media list entries keyed by username and media id.
+
+    An entry is fresh for an activity if it was fetched after the activity
+    was created, so several activities for the same media in one cycle only
+    cost one request. Concurrent lookups of the same entry share one request.
+
+    Args:
+        maxsize (int): Maximum amount of entries
+        ttl (float): Seconds until an entry is dropped regardless of activities
+
+    Attributes:
+        cache (TTLCache): Fetch time and entry per username and media id
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 86400) -> None:
+        self.cache = TTLCache(maxsize, ttl)
+        self._flight = SingleFlight()
+
+    @property
+    def hits(self) -> int:
+        return self.cache.hits
+
+    @property
+    def misses(self) -> int:
+        return self.cache.misses
+
+    async def _fetch(self, client, username: str, media_id: int) -> Optional[Any]:
+        fetched = time.time()
+
+        listitem = await client.get_list_item(username, media_id)
+        if listitem:
+            self.cache.set((username.lower(), media_id), (fetched, listitem))
+
+        return listitem
+
+    async def get(
+        self, client, username: str, media_id: int, date: int = 0
+    ) -> Optional[Any]:
+        """Returns the list entry of a user as it was at `date` or later.
+
+        Args:
+            client (RateLimitedClient): AniList client
+            username (str): Username
+            media_id (int): Media id
+            date (int): Unix timestamp of the activity. Defaults to 0.
+
+        Returns:
+            Optional[MediaList]: Media list entry
+        """
+
+        key = (username.lower(), media_id)
+
+        entry = self.cache.get(key)
+        if entry and entry[0] >= date:
+            return entry[1]
+
+        return await self._flight.do(key, self._fetch, client, username, media_id)
+
+
+profiles = ProfileCache(
+    config.getint("PROFILE_CACHE_SIZE", fallback=512),
+    config.getint("PROFILE_CACHE_TTL", fallback=600),
+)
+
+list_items = ListItemCache(config.getint("LIST_CACHE_SIZE", fallback=1024))
+
+picture_colors = TTLCache(
+    config.getint("PICTURE_CACHE_SIZE", fallback=256),
+    config.getint("PICTURE_CACHE_TTL", fallback=86400),
+)
@@ -1,34 +1,725 @@
 import asyncio
-from asyncio.events import AbstractEventLoop
+import json
+import os
+import sqlite3
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from tinydb import TinyDB, Query
-from typing import Any
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
 
+from tinydb.middlewares import CachingMiddleware
 from tinydb.queries import where
+from tinydb.storages import JSONStorage
 from ..utils import *
 
+LIST_BLOCK_STATUSES = [
+    "progress",
+    "started",
+    "completion",
+    "planning",
+    "dropped",
+    "paused",
+]
 
-class Database:
-    def __init__(self) -> None:
-        self._db: TinyDB = TinyDB("tmp/tinydb.json")
+
+def _feed_query(item: Any):
+    return (
+        (where("username") == item["username"])
+        & (where("channel") == item["channel"])
+        & (where("type") == item["type"])
+    )
+
+
+class TinyDBStorage:
+    """Stores every table in a single TinyDB JSON file.
+
+    Args:
+        path (str): Path of the JSON file
+    """
+
+    def __init__(self, path: str) -> None:
+        # changes are only written to the file by `batch`
+        self._db: TinyDB = TinyDB(path, storage=CachingMiddleware(JSONStorage))
+        self._db.storage.WRITE_CACHE_SIZE = sys.maxsize
         self.feed = self._db.table("feed")
         self.channels = self._db.table("channels")
+        self.state = self._db.table("state")
+        self.meta = self._db.table("meta")
 
-    async def feed_insert(self, items: List[Any]) -> None:
-        loop = asyncio.get_event_loop()
-        await loop.run_in_executor(None, self.feed.insert_multiple, items)
+    def batch(self, ops: List[Tuple[str, tuple]]) -> List[Optional[Exception]]:
+        """Applies many changes with a single write of the file.
 
-    async def _feed_remove(self, item: Any) -> bool:
+        Args:
+            ops (List[Tuple[str, tuple]]): Method names and arguments
+
+        Returns:
+            List[Optional[Exception]]: Exception raised by every change, if any
+        """
+
+        results = []
+
+        for op, args in ops:
+            try:
+                getattr(self, op)(*args)
+            except Exception as e:
+                results.append(e)
+            else:
+                results.append(None)
+
+        self._db.storage.flush()
+        return results
+
+    def close(self) -> None:
+        self._db.close()
+
+    def feed_insert(self, items: List[Any]) -> None:
+        self.feed.insert_multiple(items)
+
+    def feed_remove(self, item: Any) -> None:
+        self.feed.remove(_feed_query(item))
+        self.state.remove(_feed_query(item))
+
+    def feed_update(self, items: List[Any]) -> None:
+        for item in items:
+            self.feed.update(item, _feed_query(item))
+
+    def feed_get(self) -> List[Any]:
+        return self.feed.all()
+
+    def state_upsert(self, items: List[Any]) -> None:
+        for item in items:
+            self.state.upsert(item, _feed_query(item))
+
+    def state_get(self) -> List[Any]:
+        return self.state.all()
+
+    def channel_insert(self, items: List[Any]) -> None:
+        self.channels.insert_multiple(items)
+
+    def channel_update(self, id, item: Any) -> None:
+        self.channels.update(item, where("channel") == id)
+
+    def meta_get(self, key: str) -> Optional[str]:
+        item = self.meta.get(where("key") == key)
+        return item["value"] if item else None
+
+    def meta_set(self, key: str, value: str) -> None:
+        self.meta.upsert({"key": key, "value": value}, where("key") == key)
+
+    def channel_remove(self, item: Any) -> None:
+        query = where("channel") == item["channel"]
+        for status in LIST_BLOCK_STATUSES:
+            query &= where(f"list_block_{status}") == item[f"list_block_{status}"]
+
+        self.channels.remove(query)
+
+    def channel_get(self) -> List[Any]:
+        return self.channels.all()
+
+
+class SQLiteStorage:
+    """Stores every table in a SQLite database in WAL mode.
+
+    Feeds and feed states are indexed by username, channel and type, channel
+    filters by channel id. Feed states are kept as JSON documents.
+
+    Args:
+        path (str): Path of the database file
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS meta (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    );
+    CREATE TABLE IF NOT EXISTS feed (
+        username TEXT NOT NULL,
+        userid INTEGER,
+        channel TEXT NOT NULL,
+        type TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS feed_key ON feed (username, channel, type);
+    CREATE TABLE IF NOT EXISTS state (
+        username TEXT NOT NULL,
+        channel TEXT NOT NULL,
+        type TEXT NOT NULL,
+        data TEXT NOT NULL
+    );
+    CREATE UNIQUE INDEX IF NOT EXISTS state_key ON state (username, channel, type);
+    CREATE TABLE IF NOT EXISTS channels (
+        channel INTEGER NOT NULL,
+        list_block_progress INTEGER NOT NULL DEFAULT 0,
+        list_block_started INTEGER NOT NULL DEFAULT 0,
+        list_block_completion INTEGER NOT NULL DEFAULT 0,
+        list_block_planning INTEGER NOT NULL DEFAULT 0,
+        list_block_dropped INTEGER NOT NULL DEFAULT 0,
+        list_block_paused INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE INDEX IF NOT EXISTS channels_channel ON channels (channel);
+    """
+
+    FEED_INSERT = (
+        "INSERT INTO feed (username, userid, channel, type) VALUES (?, ?, ?, ?)"
+    )
+    STATE_UPSERT = (
+        "INSERT OR REPLACE INTO state (username, channel, type, data)"
+        " VALUES (?, ?, ?, ?)"
+    )
+    CHANNEL_INSERT = (
+        "INSERT INTO channels (channel, "
+        + ", ".join(f"list_block_{status}" for status in LIST_BLOCK_STATUSES)
+        + ") VALUES (?, ?, ?, ?, ?, ?, ?)"
+    )
+
+    def __init__(self, path: str) -> None:
+        self._conn = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None
+        )
+        self._conn.row_factory = sqlite3.Row
+
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+
+    @contextmanager
+    def _transaction(self) -> Iterator[None]:
+        self._conn.execute("BEGIN")
+
+        try:
+            yield
+        except:
+            self._conn.execute("ROLLBACK")
+            raise
+
+        self._conn.execute("COMMIT")
+
+    def batch(self, ops: List[Tuple[str, tuple]]) -> List[Optional[Exception]]:
+        """Applies many changes in a single transaction.
+
+        Every change runs in its own savepoint, so a failing change does not
+        affect the others.
+
+        Args:
+            ops (List[Tuple[str, tuple]]): Method names and arguments
+
+        Returns:
+            List[Optional[Exception]]: Exception raised by every change, if any
+        """
+
+        results = []
+
+        with self._transaction():
+            for op, args in ops:
+                self._conn.execute("SAVEPOINT change")
+
+                try:
+                    getattr(self, op)(*args)
+                except Exception as e:
+                    self._conn.execute("ROLLBACK TO change")
+                    results.append(e)
+                else:
+                    results.append(None)
+
+                self._conn.execute("RELEASE change")
+
+        return results
+
+    def close(self) -> None:
+        self._conn.close()
+
+    @staticmethod
+    def _feed_row(item: Any) -> tuple:
+        return (item["username"], item.get("userid"), item["channel"], item["type"])
+
+    @staticmethod
+    def _feed_key(item: Any) -> tuple:
+        return (item["username"], str(item["channel"]), str(item["type"]))
+
+    @staticmethod
+    def _channel_row(item: Any) -> tuple:
+        return (int(item["channel"]),) + tuple(
+            bool(item.get(f"list_block_{status}", False))
+            for status in LIST_BLOCK_STATUSES
+        )
+
+    def meta_get(self, key: str) -> Optional[str]:
+        row = self._conn.execute(
+            "SELECT value FROM meta WHERE key = ?", (key,)
+        ).fetchone()
+        return row["value"] if row else None
+
+    def meta_set(self, key: str, value: str) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value)
+        )
+
+    def feed_insert(self, items: List[Any]) -> None:
+        self._conn.executemany(
+            self.FEED_INSERT, [self._feed_row(item) for item in items]
+        )
+
+    def feed_remove(self, item: Any) -> None:
+        key = self._feed_key(item)
+
+        self._conn.execute(
+            "DELETE FROM feed WHERE username = ? AND channel = ? AND type = ?", key
+        )
+        self._conn.execute(
+            "DELETE FROM state WHERE username = ? AND channel = ? AND type = ?", key
+        )
+
+    def feed_update(self, items: List[Any]) -> None:
+        self._conn.executemany(
+            "UPDATE feed SET username = ?, userid = ?, channel = ?, type = ?"
+            " WHERE username = ? AND channel = ? AND type = ?",
+            [self._feed_row(item) + self._feed_key(item) for item in items],
+        )
+
+    def feed_get(self) -> List[Any]:
+        items = []
+        for row in self._conn.execute("SELECT * FROM feed"):
+            item = dict(row)
+            if item["userid"] is None:
+                del item["userid"]
+            items.append(item)
+
+        return items
+
+    def state_upsert(self, items: List[Any]) -> None:
+        self._conn.executemany(
+            self.STATE_UPSERT,
+            [self._feed_key(item) + (json.dumps(item),) for item in items],
+        )
+
+    def state_get(self) -> List[Any]:
+        return [
+            json.loads(row["data"])
+            for row in self._conn.execute("SELECT data FROM state")
+        ]
+
+    def channel_insert(self, items: List[Any]) -> None:
+        self._conn.executemany(
+            self.CHANNEL_INSERT, [self._channel_row(item) for item in items]
+        )
+
+    def channel_update(self, id, item: Any) -> None:
+        assignments = ", ".join(
+            f"list_block_{status} = ?" for status in LIST_BLOCK_STATUSES
+        )
+
+        self._conn.execute(
+            f"UPDATE channels SET {assignments} WHERE channel = ?",
+            self._channel_row(item)[1:] + (int(id),),
+        )
+
+    def _channel(self, row: sqlite3.Row) -> Any:
+        item = dict(row)
+        for status in LIST_BLOCK_STATUSES:
+            item[f"list_block_{status}"] = bool(item[f"list_block_{status}"])
+
+        return item
+
+    def channel_remove(self, item: Any) -> None:
+        conditions = " AND ".join(
+            f"list_block_{status} = ?" for status in LIST_BLOCK_STATUSES
+        )
+
+        self._conn.execute(
+            f"DELETE FROM channels WHERE channel = ? AND {conditions}",
+            self._channel_row(item),
+        )
+
+    def channel_get(self) -> List[Any]:
+        return [
+            self._channel(row) for row in self._conn.execute("SELECT * FROM channels")
+        ]
+
+    def migrate_tinydb(self, path: str) -> None:
+        """Copies every table of a TinyDB file once.
+
+        The TinyDB file is left untouched as a backup.
+
+        Args:
+            path (str): Path of the TinyDB JSON file
+        """
+
+        if self.meta_get("tinydb_migrated") or not os.path.isfile(path):
+            return
+
+        source = TinyDBStorage(path)
+        feed = source.feed_get()
+        state = source.state_get()
+        channels = source.channel_get()
+
+        with self._transaction():
+            self._conn.executemany(
+                self.FEED_INSERT, [self._feed_row(item) for item in feed]
+            )
+            self._conn.executemany(
+                self.STATE_UPSERT,
+                [self._feed_key(item) + (json.dumps(item),) for item in state],
+            )
+            self._conn.executemany(
+                self.CHANNEL_INSERT, [self._channel_row(item) for item in channels]
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                ("tinydb_migrated", "1"),
+            )
+
+        logger.info(
+            f"Migrated {len(feed)} feeds, {len(state)} feed states and"
+            f" {len(channels)} channels from {path}"
+        )
+
+
+class JournalStorage:
+    """Keeps every table in memory and appends each change to a journal.
+
+    At startup the last snapshot is loaded and the journal is replayed on top
+    of it. Once the journal grows past `compact_size` bytes, the tables are
+    written to a new snapshot in the background and a new journal is started.
+    Every change and snapshot carries a sequence number, so changes that are
+    already part of the snapshot are skipped when the journal is replayed
+    and a torn last line from a crash is ignored.
+
+    Args:
+        path (str): Path prefix of the snapshot and journal files
+        compact_size (int): Journal size in bytes that triggers a compaction
+    """
+
+    def __init__(self, path: str, compact_size: int = 1024 * 1024) -> None:
+        self.snapshot_path = path + ".snapshot.json"
+        self.journal_path = path + ".journal"
+        self.compact_size = compact_size
+
+        # keyed like the indexes of the SQLite storage, so every change is O(1)
+        self.feed: Dict[tuple, Any] = {}
+        self.state: Dict[tuple, Any] = {}
+        self.channels: Dict[int, Any] = {}
+        self.meta: Dict[str, str] = {}
+
+        self.seq = 0
+        self._compaction: Optional[threading.Thread] = None
+
+        self._load()
+        self._journal = open(self.journal_path, "a")
+
+    @staticmethod
+    def _feed_key(item: Any) -> tuple:
+        return (item["username"], str(item["channel"]), str(item["type"]))
+
+    def _load(self) -> None:
+        if os.path.isfile(self.snapshot_path):
+            with open(self.snapshot_path, "r") as fp:
+                snapshot = json.load(fp)
+
+            self.seq = snapshot["seq"]
+            self.meta = snapshot.get("meta", {})
+            self.feed_insert(snapshot["feed"])
+            self.state_upsert(snapshot["state"])
+            self.channel_insert(snapshot["channels"])
+
+        # the previous journal is left behind if a compaction did not finish
+        for path in (self.journal_path + ".old", self.journal_path):
+            if not os.path.isfile(path):
+                continue
+
+            valid = 0
+            with open(path, "rb") as fp:
+                for line in fp:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break
+
+                    valid += len(line)
+                    if record["seq"] <= self.seq:
+                        continue
+
+                    getattr(self, record["op"])(*record["args"])
+                    self.seq = record["seq"]
+
+            # drop a torn last line, new changes are appended after it
+            if valid < os.path.getsize(path):
+                os.truncate(path, valid)
+
+    def _snapshot(self) -> str:
+        return json.dumps(
+            {
+                "seq": self.seq,
+                "feed": list(self.feed.values()),
+                "state": list(self.state.values()),
+                "channels": list(self.channels.values()),
+                "meta": self.meta,
+            },
+            separators=(",", ":"),
+        )
+
+    def _write_snapshot(self, snapshot: str) -> None:
+        with open(self.snapshot_path + ".tmp", "w") as fp:
+            fp.write(snapshot)
+            fp.flush()
+            os.fsync(fp.fileno())
+
+        os.replace(self.snapshot_path + ".tmp", self.snapshot_path)
+
+        if os.path.isfile(self.journal_path + ".old"):
+            os.remove(self.journal_path + ".old")
+
+    def _compact(self, snapshot: str) -> None:
+        try:
+            self._write_snapshot(snapshot)
+        except Exception as e:
+            logger.warning(f"Could not write database snapshot: {e}")
+
+    def compact(self) -> None:
+        """Starts a new journal and writes a snapshot in the background."""
+
+        if self._compaction and self._compaction.is_alive():
+            return
+
+        snapshot = self._snapshot()
+
+        # the last compaction failed, its journal is not part of a snapshot yet
+        if os.path.isfile(self.journal_path + ".old"):
+            self._write_snapshot(snapshot)
+
+            self._journal.close()
+            self._journal = open(self.journal_path, "w")
+            return
+
+        self._journal.close()
+        os.replace(self.journal_path, self.journal_path + ".old")
+        self._journal = open(self.journal_path, "a")
+
+        self._compaction = threading.Thread(
+            target=self._compact, args=(snapshot,), daemon=True
+        )
+        self._compaction.start()
+
+    def batch(self, ops: List[Tuple[str, tuple]]) -> List[Optional[Exception]]:
+        """Applies many changes and appends them to the journal with one write.
+
+        Args:
+            ops (List[Tuple[str, tuple]]): Method names and arguments
+
+        Returns:
+            List[Optional[Exception]]: Exception raised by every change, if any
+        """
+
+        results = []
+        records = []
+
+        for op, args in ops:
+            # serialized first, a change that cannot be journaled is not applied
+            try:
+                record = json.dumps({"seq": self.seq + 1, "op": op, "args": args})
+                getattr(self, op)(*args)
+            except Exception as e:
+                results.append(e)
+                continue
+
+            self.seq += 1
+            records.append(record + "\n")
+            results.append(None)
+
+        self._journal.write("".join(records))
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+
+        if self._journal.tell() > self.compact_size:
+            self.compact()
+
+        return results
+
+    def close(self) -> None:
+        if self._compaction:
+            self._compaction.join()
+
+        self._journal.close()
+
+    def meta_get(self, key: str) -> Optional[str]:
+        return self.meta.get(key)
+
+    def meta_set(self, key: str, value: str) -> None:
+        self.meta[key] = value
+
+    def feed_insert(self, items: List[Any]) -> None:
+        for item in items:
+            self.feed[self._feed_key(item)] = dict(item)
+
+    def feed_remove(self, item: Any) -> None:
+        key = self._feed_key(item)
+
+        self.feed.pop(key, None)
+        self.state.pop(key, None)
+
+    def feed_update(self, items: List[Any]) -> None:
+        for item in items:
+            feed = self.feed.get(self._feed_key(item))
+            if feed:
+                feed.update(item)
+
+    def feed_get(self) -> List[Any]:
+        return [dict(item) for item in self.feed.values()]
+
+    def state_upsert(self, items: List[Any]) -> None:
+        for item in items:
+            self.state[self._feed_key(item)] = dict(item)
+
+    def state_get(self) -> List[Any]:
+        return [dict(item) for item in self.state.values()]
+
+    def channel_insert(self, items: List[Any]) -> None:
+        for item in items:
+            self.channels[int(item["channel"])] = dict(item)
+
+    def channel_update(self, id, item: Any) -> None:
+        channel = self.channels.get(int(id))
+        if channel:
+            channel.update(item)
+
+    def channel_remove(self, item: Any) -> None:
+        channel = self.channels.get(int(item["channel"]))
+        if channel and all(
+            channel.get(f"list_block_{status}") == item[f"list_block_{status}"]
+            for status in LIST_BLOCK_STATUSES
+        ):
+            del self.channels[int(item["channel"])]
+
+    def channel_get(self) -> List[Any]:
+        return [dict(channel) for channel in self.channels.values()]
+
+    def migrate_tinydb(self, path: str) -> None:
+        """Writes a TinyDB file as the first snapshot.
+
+        The TinyDB file is left untouched as a backup.
+
+        Args:
+            path (str): Path of the TinyDB JSON file
+        """
+
+        if self.seq or self.feed or self.channels or not os.path.isfile(path):
+            return
+
+        source = TinyDBStorage(path)
+        self.feed_insert(source.feed_get())
+        self.state_upsert(source.state_get())
+        self.channel_insert(source.channel_get())
+
+        self._write_snapshot(self._snapshot())
+
+        logger.info(
+            f"Migrated {len(self.feed)} feeds, {len(self.state)} feed states and"
+            f" {len(self.channels)} channels from {path}"
+        )
+
+
+class Database:
+    # seconds that changes are collected before they are written together
+    WRITE_WINDOW = 0.05
+
+    def __init__(self, storage: "Storage") -> None:
+        self.storage = storage
+
+        self.filters: Dict[int, Any] = {}
+
+        # the storages are not thread safe, every call runs on this thread
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="database"
+        )
+
+        self._pending: List[Tuple[str, tuple, asyncio.Future]] = []
+        self._flush_task: Optional[asyncio.Task] = None
+
+    async def _run(self, func, *args) -> Any:
         loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    async def _read(self, func, *args) -> Any:
+        await self.flush()
+        return await self._run(func, *args)
+
+    def _write(self, op: str, *args) -> asyncio.Future:
+        future = asyncio.get_event_loop().create_future()
+        self._pending.append((op, args, future))
+
+        if not self._flush_task:
+            self._flush_task = asyncio.ensure_future(self._flush_later())
+
+        return future
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.WRITE_WINDOW)
+
+        self._flush_task = None
+        await self.flush()
+
+    async def flush(self) -> None:
+        """Writes every pending change in one batch."""
+
+        if not self._pending:
+            return
+
+        pending, self._pending = self._pending, []
+
         try:
-            await loop.run_in_executor(
-                None,
-                self.feed.remove,
-                (
-                    (where("username") == item["username"])
-                    & (where("channel") == item["channel"])
-                    & (where("type") == item["type"])
-                ),
+            results = await self._run(
+                self.storage.batch, [(op, args) for op, args, _ in pending]
             )
+        except Exception as e:
+            results = [e] * len(pending)
+
+        for (_, _, future), result in zip(pending, results):
+            if future.done():
+                continue
+
+            if result is None:
+                future.set_result(None)
+            else:
+                future.set_exception(result)
+
+    def _migrate(self) -> int:
+        version = int(self.storage.meta_get("schema_version") or 0)
+
+        for target in range(version + 1, SCHEMA_VERSION + 1):
+            ops = MIGRATIONS[target - 1](self.storage)
+            ops.append(("meta_set", ("schema_version", str(target))))
+
+            for result in self.storage.batch(ops):
+                if result is not None:
+                    raise result
+
+            logger.info(f"Migrated database to schema version {target}")
+
+        return version
+
+    async def migrate(self) -> None:
+        """Upgrades every stored row to the current schema version.
+
+        Rows are only touched when the stored version is older than
+        `SCHEMA_VERSION`, every migration is applied as a single batch.
+        """
+
+        await self.flush()
+        await self._run(self._migrate)
+
+    async def close(self) -> None:
+        """Writes pending changes and closes the storage."""
+
+        await self.flush()
+        await self._run(self.storage.close)
+        self._executor.shutdown()
+
+    async def feed_insert(self, items: List[Any]) -> None:
+        await self._write("feed_insert", items)
+
+    async def _feed_remove(self, item: Any) -> bool:
+        try:
+            await self._write("feed_remove", item)
         except:
             return False
 
@@ -41,111 +732,42 @@ class Database:
 
         return await asyncio.gather(*tasks, return_exceptions=True)
 
+    async def feed_update(self, items: List[Any]) -> None:
+        await self._write("feed_update", items)
+
     async def feed_get(self) -> List[Any]:
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, self.feed.all)
+        return await self._read(self.storage.feed_get)
+
+    async def state_upsert(self, items: List[Any]) -> None:
+        await self._write("state_upsert", items)
+
+    async def state_get(self) -> List[Any]:
+        return await self._read(self.storage.state_get)
 
     async def channel_insert(self, items: List[Any]) -> None:
-        loop = asyncio.get_event_loop()
+        await self._write("channel_insert", items)
 
         for item in items:
-            for status in [
-                "progress",
-                "started",
-                "completion",
-                "planning",
-                "dropped",
-                "paused",
-            ]:
-                if not f"list_block_{status}" in item:
-                    item[f"list_block_{status}"] = False
-
-        await loop.run_in_executor(None, self.channels.insert_multiple, items)
+            self.filters[int(item["channel"])] = dict(item)
 
     async def channel_update(self, id, item: Any) -> None:
-        loop = asyncio.get_event_loop()
-
-        for status in [
-            "progress",
-            "started",
-            "completion",
-            "planning",
-            "dropped",
-            "paused",
-        ]:
-            if not f"list_block_{status}" in item:
-                item[f"list_block_{status}"] = False
-
         try:
-            await loop.run_in_executor(
-                None,
-                self.channels.update,
-                item,
-                where("channel") == id,
-            )
+            await self._write("channel_update", id, item)
         except:
             return False
 
-        return True
-
-    async def channel_repair(self, id) -> None:
-        loop = asyncio.get_event_loop()
-        channel = self.channels.get(where("channel") == int(id))
-
-        for status in [
-            "progress",
-            "started",
-            "completion",
-            "planning",
-            "dropped",
-            "paused",
-        ]:
-            if not f"list_block_{status}" in channel:
-                channel[f"list_block_{status}"] = False
-
-        try:
-            await loop.run_in_executor(
-                None,
-                self.channels.update,
-                channel,
-                where("channel") == id,
-            )
-        except:
-            return False
+        self.filters[int(id)] = dict(item)
 
         return True
 
     async def _channel_remove(self, item: Any) -> bool:
-        loop = asyncio.get_event_loop()
-
-        for status in [
-            "progress",
-            "started",
-            "completion",
-            "planning",
-            "dropped",
-            "paused",
-        ]:
-            if not f"list_block_{status}" in item:
-                item[f"list_block_{status}"] = False
-
         try:
-            await loop.run_in_executor(
-                None,
-                self.channels.remove,
-                (
-                    (where("channel") == item["channel"])
-                    & (where("list_block_progress") == item["list_block_progress"])
-                    & (where("list_block_started") == item["list_block_started"])
-                    & (where("list_block_completion") == item["list_block_completion"])
-                    & (where("list_block_planning") == item["list_block_planning"])
-                    & (where("list_block_dropped") == item["list_block_dropped"])
-                    & (where("list_block_paused") == item["list_block_paused"])
-                ),
-            )
+            await self._write("channel_remove", item)
         except:
             return False
 
+        self.filters.pop(int(item["channel"]), None)
+
         return True
 
     async def channel_remove(self, items: List[Any]) -> List[bool]:
@@ -156,8 +778,78 @@ class Database:
         return await asyncio.gather(*tasks, return_exceptions=True)
 
     async def channel_get(self) -> List[Any]:
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, self.channels.all)
+        return await self._read(self.storage.channel_get)
+
+    async def channel_load(self) -> None:
+        """Loads the filters of every channel into memory."""
+
+        channels = await self.channel_get()
+        self.filters = {int(ch["channel"]): dict(ch) for ch in channels}
+
+    def channel_filter(self, id: int) -> Optional[Any]:
+        """Returns the filters of a channel without touching the database.
+
+        Args:
+            id (int): Channel id
+
+        Returns:
+            Optional[Any]: Channel filters or None if the channel has none
+        """
+
+        return self.filters.get(int(id))
+
+
+Storage = Union[TinyDBStorage, SQLiteStorage, JournalStorage]
+
+
+def _migrate_list_blocks(storage: Storage) -> List[Tuple[str, tuple]]:
+    # channels saved before every list activity type could be filtered
+    ops = []
+
+    for channel in storage.channel_get():
+        missing = {
+            f"list_block_{status}": False
+            for status in LIST_BLOCK_STATUSES
+            if f"list_block_{status}" not in channel
+        }
+
+        if missing:
+            ops.append(("channel_update", (channel["channel"], {**channel, **missing})))
+
+    return ops
+
+
+# migration `i` upgrades the schema from version `i` to `i + 1`
+MIGRATIONS = [_migrate_list_blocks]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def create_storage(backend: str) -> Storage:
+    """Opens the storage backend selected in the config.
+
+    Args:
+        backend (str): `sqlite`, `journal` or `tinydb`
+
+    Returns:
+        Storage: Storage backend
+    """
+
+    if backend == "tinydb":
+        return TinyDBStorage("tmp/tinydb.json")
+
+    if backend == "journal":
+        storage = JournalStorage(
+            "tmp/mitsu",
+            config.getint("JOURNAL_COMPACT_SIZE", fallback=1024 * 1024),
+        )
+        storage.migrate_tinydb("tmp/tinydb.json")
+
+        return storage
+
+    storage = SQLiteStorage("tmp/mitsu.db")
+    storage.migrate_tinydb("tmp/tinydb.json")
+
+    return storage
 
 
-database = Database()
+database = Database(create_storage(config.get("DATABASE", fallback="sqlite")))
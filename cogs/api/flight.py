@@ -0,0 +1,44 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """Shares a single in-flight call between concurrent callers with the same key.
+
+    Attributes:
+        calls (int): Calls that were started
+        shared (int): Calls that waited for an in-flight call instead
+    """
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.shared = 0
+
+        self._futures: Dict[Hashable, asyncio.Future] = {}
+
+    async def do(
+        self, key: Hashable, func: Callable[..., Awaitable[Any]], *args, **kwargs
+    ) -> Any:
+        """Awaits `func(*args, **kwargs)` unless a call with the same key is running.
+
+        Args:
+            key (Hashable): Key that identifies identical calls
+            func (method): Coroutine function to call
+
+        Returns:
+            Any: Result of the call
+        """
+
+        if key in self._futures:
+            self.shared += 1
+            return await asyncio.shield(self._futures[key])
+
+        future = asyncio.ensure_future(func(*args, **kwargs))
+        self._futures[key] = future
+        self.calls += 1
+
+        try:
+            return await asyncio.shield(future)
+        finally:
+            if self._futures.get(key) is future:
+                del self._futures[key]
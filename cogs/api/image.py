@@ -0,0 +1,74 @@
+import asyncio
+import io
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from PIL import Image
+
+_executor: ThreadPoolExecutor = None
+
+
+def dominant_color(
+    data: bytes, size: int = 64, colors: int = 8
+) -> Optional[Tuple[int, int, int]]:
+    """Returns the most common colour of an image.
+
+    The image is downscaled and reduced to a small palette first, so the
+    histogram only has `colors` bins instead of one per unique pixel.
+
+    Args:
+        data (bytes): Encoded image
+        size (int): Maximum width and height the image is scaled to. Defaults to 64.
+        colors (int): Size of the reduced palette. Defaults to 8.
+
+    Returns:
+        Optional[Tuple[int, int, int]]: RGB colour or None if the image is empty
+    """
+
+    img = Image.open(io.BytesIO(data))
+    img.draft("RGB", (size, size))
+    img = img.convert("RGB")
+    img.thumbnail((size, size))
+
+    quantized = img.quantize(colors=colors)
+    counts = quantized.getcolors(colors)
+    if not counts:
+        return None
+
+    _, index = max(counts)
+    palette = quantized.getpalette()
+
+    return tuple(palette[index * 3 : index * 3 + 3])
+
+
+async def dominant_color_async(data: bytes) -> Optional[Tuple[int, int, int]]:
+    """Runs `dominant_color` in a worker thread.
+
+    Pillow releases the GIL while it decodes, scales and quantizes, so the
+    event loop keeps running. A thread also avoids worker processes that
+    import the bot again on platforms that spawn them.
+
+    Args:
+        data (bytes): Encoded image
+
+    Returns:
+        Optional[Tuple[int, int, int]]: RGB colour or None if the image is empty
+    """
+
+    global _executor
+
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1)
+
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(_executor, dominant_color, data)
+
+
+def shutdown() -> None:
+    """Stops the worker thread."""
+
+    global _executor
+
+    if _executor is not None:
+        _executor.shutdown(wait=False)
+        _executor = None
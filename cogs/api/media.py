@@ -0,0 +1,313 @@
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Optional, Tuple
+
+from anilist.types import Manga
+
+from ..utils import *
+from .flight import SingleFlight
+
+# seconds until a record is fetched again, per airing status
+MEDIA_TTL = {
+    "FINISHED": 7 * 86400,
+    "CANCELLED": 7 * 86400,
+    "RELEASING": 6 * 3600,
+    "NOT_YET_RELEASED": 86400,
+    "HIATUS": 86400,
+}
+MEDIA_TTL_DEFAULT = 86400
+
+
+def _timestamp(date: Any) -> Optional[int]:
+    if not date:
+        return None
+
+    timestamp = date.get_timestamp()
+    return timestamp if timestamp != -1 else None
+
+
+@dataclass(frozen=True)
+class MediaRecord:
+    """Fields of an anime or manga that are used by the embeds."""
+
+    type: str
+    id: int
+    url: str
+
+    title_romaji: str
+    title_english: Optional[str]
+    title_native: Optional[str]
+    description: Optional[str]
+
+    status: Optional[str]
+    start_date: Optional[int]
+    end_date: Optional[int]
+    next_airing_at: Optional[int]
+    next_airing_episode: Optional[int]
+    season_name: Optional[str]
+    season_year: Optional[int]
+
+    score: Optional[float]
+    ranking: Optional[Tuple[int, str, Optional[int], bool]]
+    popularity: Optional[int]
+
+    episodes: Optional[int]
+    chapters: Optional[int]
+    volumes: Optional[int]
+
+    is_adult: bool
+    cover: Optional[str]
+
+    fetched: float
+
+    @property
+    def is_manga(self) -> bool:
+        return self.type == "MANGA"
+
+    @staticmethod
+    def from_media(media: Any) -> "MediaRecord":
+        """Creates a record from an AniList anime or manga.
+
+        Args:
+            media (Union[Anime, Manga]): AniList media
+
+        Returns:
+            MediaRecord: Compact record of the media
+        """
+
+        ranking = None
+        if hasattr(media, "rankings") and media.rankings:
+            r = media.rankings[0]
+            ranking = (
+                r.rank,
+                str(r.format),
+                r.year if hasattr(r, "year") else None,
+                bool(r.all_time),
+            )
+
+        title = media.title
+        season = getattr(media, "season", None)
+        next_airing = getattr(media, "next_airing", None)
+        score = getattr(media, "score", None)
+
+        return MediaRecord(
+            type="MANGA" if isinstance(media, Manga) else "ANIME",
+            id=media.id,
+            url=media.url,
+            title_romaji=title.romaji,
+            title_english=getattr(title, "english", None),
+            title_native=getattr(title, "native", None),
+            description=getattr(media, "description", None),
+            status=str(media.status) if hasattr(media, "status") else None,
+            start_date=_timestamp(getattr(media, "start_date", None)),
+            end_date=_timestamp(getattr(media, "end_date", None)),
+            next_airing_at=_timestamp(next_airing.at) if next_airing else None,
+            next_airing_episode=next_airing.episode if next_airing else None,
+            season_name=getattr(season, "name", None),
+            season_year=getattr(season, "year", None),
+            score=getattr(score, "mean", None),
+            ranking=ranking,
+            popularity=getattr(media, "popularity", None),
+            episodes=getattr(media, "episodes", None),
+            chapters=getattr(media, "chapters", None),
+            volumes=getattr(media, "volumes", None),
+            is_adult=bool(getattr(media, "is_adult", False)),
+            cover=media.cover.large if hasattr(media, "cover") else None,
+            fetched=time.time(),
+        )
+
+    @staticmethod
+    def from_dict(data: Dict[str, Any]) -> "MediaRecord":
+        if data.get("ranking"):
+            data = {**data, "ranking": tuple(data["ranking"])}
+
+        return MediaRecord(**data)
+
+
+class MediaCache:
+    """Anime and manga records keyed by media type and id, saved to disk.
+
+    Records of finished media are kept for a week, records of releasing
+    media only until their next episode airs.
+
+    Args:
+        path (str): JSON file the records are saved to
+        maxsize (int): Maximum amount of records
+
+    Attributes:
+        records (OrderedDict[Tuple[str, int], MediaRecord]): Records, least
+            recently used first
+        dirty (bool): If there are records that are not saved yet
+    """
+
+    def __init__(self, path: str, maxsize: int = 2048) -> None:
+        self.path = path
+        self.maxsize = max(1, maxsize)
+        self.dirty = False
+
+        self.hits = 0
+        self.misses = 0
+
+        self.records: "OrderedDict[Tuple[str, int], MediaRecord]" = OrderedDict()
+        self._flight = SingleFlight()
+
+    @staticmethod
+    def fresh(record: MediaRecord) -> bool:
+        """Checks if a record does not need to be fetched again.
+
+        Args:
+            record (MediaRecord): Media record
+
+        Returns:
+            bool: True if the record is fresh
+        """
+
+        expires = record.fetched + MEDIA_TTL.get(record.status, MEDIA_TTL_DEFAULT)
+
+        if record.status == "RELEASING" and record.next_airing_at:
+            if record.next_airing_at > record.fetched:
+                expires = min(expires, record.next_airing_at)
+
+        return time.time() < expires
+
+    def _set(self, record: MediaRecord) -> None:
+        key = (record.type, record.id)
+
+        self.records[key] = record
+        self.records.move_to_end(key)
+        self.dirty = True
+
+        while len(self.records) > self.maxsize:
+            self.records.popitem(last=False)
+
+    def lookup(self, content_type: str, id: int) -> Optional[MediaRecord]:
+        """Returns a fresh record without fetching it.
+
+        Args:
+            content_type (str): `anime` or `manga`
+            id (int): Media id
+
+        Returns:
+            Optional[MediaRecord]: Media record or None if there is no fresh one
+        """
+
+        key = (content_type.upper(), id)
+
+        record = self.records.get(key)
+        if record and self.fresh(record):
+            self.records.move_to_end(key)
+            self.hits += 1
+            return record
+
+        self.misses += 1
+        return None
+
+    def put(self, media: Any) -> MediaRecord:
+        """Returns the fresh record of a media or stores the given one.
+
+        Args:
+            media (Union[Anime, Manga]): AniList media
+
+        Returns:
+            MediaRecord: Media record
+        """
+
+        content_type = "manga" if isinstance(media, Manga) else "anime"
+
+        record = self.lookup(content_type, media.id)
+        if record:
+            return record
+
+        record = MediaRecord.from_media(media)
+        self._set(record)
+
+        return record
+
+    async def _fetch(self, client, content_type: str, id: int) -> Optional[MediaRecord]:
+        media = await client.get(id=id, content_type=content_type)
+        if not media:
+            return None
+
+        record = MediaRecord.from_media(media)
+        self._set(record)
+
+        return record
+
+    async def get(self, client, content_type: str, id: int) -> Optional[MediaRecord]:
+        """Returns the record of a media, fetching it if it is not fresh.
+
+        Args:
+            client (RateLimitedClient): AniList client
+            content_type (str): `anime` or `manga`
+            id (int): Media id
+
+        Returns:
+            Optional[MediaRecord]: Media record
+        """
+
+        record = self.lookup(content_type, id)
+        if record:
+            return record
+
+        return await self._flight.do(
+            (content_type.upper(), id), self._fetch, client, content_type, id
+        )
+
+    def _load(self) -> None:
+        if not os.path.isfile(self.path):
+            return
+
+        with open(self.path, "r") as fp:
+            records = json.load(fp)
+
+        for data in records:
+            try:
+                record = MediaRecord.from_dict(data)
+            except TypeError:
+                continue
+
+            self.records[(record.type, record.id)] = record
+
+    async def load(self) -> None:
+        """Loads the saved records."""
+
+        loop = asyncio.get_event_loop()
+
+        try:
+            await loop.run_in_executor(None, self._load)
+        except Exception as e:
+            logger.warning(f"Could not load media cache: {e}")
+
+        self.dirty = False
+
+    def _save(self, records: list) -> None:
+        with open(self.path + ".tmp", "w") as fp:
+            json.dump(records, fp, separators=(",", ":"))
+
+        os.replace(self.path + ".tmp", self.path)
+
+    async def save(self) -> None:
+        """Saves the records if any of them changed."""
+
+        if not self.dirty:
+            return
+
+        self.dirty = False
+        records = [asdict(record) for record in self.records.values()]
+
+        loop = asyncio.get_event_loop()
+
+        try:
+            await loop.run_in_executor(None, self._save, records)
+        except Exception as e:
+            self.dirty = True
+            logger.warning(f"Could not save media cache: {e}")
+
+
+media_cache = MediaCache(
+    "tmp/media.json", config.getint("MEDIA_CACHE_SIZE", fallback=2048)
+)
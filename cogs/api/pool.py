@@ -0,0 +1,66 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Iterable
+
+from loguru import logger
+
+
+class WorkerPool:
+    """Fixed number of asyncio workers pulling items from a shared queue.
+
+    Args:
+        workers (int): Number of concurrent workers
+        func (method): Coroutine function that is awaited for every item
+
+    Attributes:
+        workers (int): Number of concurrent workers
+        func (method): Coroutine function that is awaited for every item
+        elapsed (float): Duration of the last run in seconds
+    """
+
+    def __init__(self, workers: int, func: Callable[[Any], Awaitable[Any]]) -> None:
+        self.workers = max(1, workers)
+        self.func = func
+        self.elapsed = 0.0
+
+    async def _worker(self, queue: asyncio.Queue) -> None:
+        while True:
+            item = await queue.get()
+
+            try:
+                await self.func(item)
+            except Exception as e:
+                logger.error(f"Worker failed on {item}: {e}")
+            finally:
+                queue.task_done()
+
+    async def run(self, items: Iterable[Any]) -> float:
+        """Runs `func` on every item and waits until the queue is drained.
+
+        Args:
+            items (Iterable[Any]): Items to process
+
+        Returns:
+            float: Time it took to process all items in seconds
+        """
+
+        start = time.monotonic()
+
+        queue = asyncio.Queue()
+        for item in items:
+            queue.put_nowait(item)
+
+        tasks = [
+            asyncio.ensure_future(self._worker(queue))
+            for _ in range(min(self.workers, queue.qsize()))
+        ]
+
+        try:
+            await queue.join()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        self.elapsed = time.monotonic() - start
+        return self.elapsed
@@ -0,0 +1,278 @@
+import asyncio
+import functools
+import time
+from typing import Any, Hashable, Mapping, Optional
+
+from loguru import logger
+
+from ..http import get_session
+from .flight import SingleFlight
+
+ANILIST_URL = "https://graphql.anilist.co"
+
+
+def _freeze(value: Any) -> Hashable:
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+
+    if isinstance(value, (list, tuple, set)):
+        return tuple(_freeze(v) for v in value)
+
+    hash(value)
+    return value
+
+
+def request_key(method: str, args: tuple, kwargs: dict) -> Optional[Hashable]:
+    """Returns a key that identifies identical requests.
+
+    Args:
+        method (str): Method name or query
+        args (tuple): Positional arguments
+        kwargs (dict): Keyword arguments
+
+    Returns:
+        Optional[Hashable]: Key or None if an argument cannot be hashed
+    """
+
+    try:
+        return (method, _freeze(args), _freeze(kwargs))
+    except TypeError:
+        return None
+
+
+class TokenBucket:
+    """Process-wide token bucket for outgoing requests.
+
+    The bucket adapts to the rate limit headers AniList sends back. The refill
+    rate is halved on every 429 response and the bucket is paused for the
+    `Retry-After` duration, afterwards it recovers step by step as long as the
+    server reports enough remaining budget.
+
+    Args:
+        rate (float): Allowed requests per minute
+        burst (int): Maximum amount of tokens that can be saved up
+
+    Attributes:
+        rate (float): Tokens added per second at full speed
+        capacity (int): Maximum amount of tokens that can be saved up
+        tokens (float): Currently available tokens
+        scale (float): Multiplier applied to `rate`, between `MIN_SCALE` and 1
+        limit (int): Last `X-RateLimit-Limit` value reported by the server
+        remaining (int): Last `X-RateLimit-Remaining` value reported by the server
+    """
+
+    MIN_SCALE = 0.25
+
+    def __init__(self, rate: float, burst: int = 1) -> None:
+        self.rate = max(rate, 1) / 60.0
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+
+        self.scale = 1.0
+        self.limit: Optional[int] = None
+        self.remaining: Optional[int] = None
+
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+
+    @property
+    def backoff_remaining(self) -> float:
+        """Seconds left until requests are allowed again."""
+        return max(0.0, self._paused_until - time.monotonic())
+
+    @property
+    def throttled(self) -> bool:
+        """If the bucket is currently paused by a 429 response."""
+        return self.backoff_remaining > 0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(
+            self.capacity,
+            self.tokens + (now - self._updated) * self.rate * self.scale,
+        )
+        self._updated = now
+
+    def backoff(self, seconds: float) -> None:
+        """Pauses every caller for `seconds` and halves the refill rate.
+
+        Args:
+            seconds (float): Duration of the pause
+        """
+
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self.scale = max(self.MIN_SCALE, self.scale / 2)
+        self.tokens = 0.0
+
+        logger.warning(
+            f"AniList rate limit hit, backing off for {seconds:.0f}s"
+            f" (rate scaled to {self.scale:.2f})"
+        )
+
+    def update(self, status: int, headers: Mapping[str, str]) -> None:
+        """Adjusts the bucket to a response from AniList.
+
+        Args:
+            status (int): HTTP status code
+            headers (Mapping[str, str]): Response headers
+        """
+
+        limit = headers.get("X-RateLimit-Limit")
+        if limit and limit.isdecimal():
+            self.limit = int(limit)
+
+        remaining = headers.get("X-RateLimit-Remaining")
+        if remaining and remaining.isdecimal():
+            self.remaining = int(remaining)
+            self.tokens = min(self.tokens, self.remaining)
+
+        if status == 429:
+            retry_after = headers.get("Retry-After")
+            self.backoff(
+                float(retry_after) if retry_after and retry_after.isdecimal() else 60
+            )
+            return
+
+        if self.limit and self.remaining is not None:
+            if self.remaining < self.limit / 4:
+                self.scale = max(self.MIN_SCALE, self.scale * 0.9)
+                return
+
+        self.scale = min(1.0, self.scale + 0.05)
+
+    async def acquire(self, tokens: int = 1) -> None:
+        """Waits until `tokens` tokens are available and takes them.
+
+        Waiters are served in the order they arrived.
+
+        Args:
+            tokens (int): Amount of tokens to take. Defaults to 1.
+        """
+
+        if not self._lock:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            while True:
+                if self.throttled:
+                    await asyncio.sleep(self.backoff_remaining)
+                    continue
+
+                self._refill()
+
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+
+                await asyncio.sleep((tokens - self.tokens) / (self.rate * self.scale))
+
+
+class RateLimitedClient:
+    """Proxy around the AniList client that takes a token before every request.
+
+    Every coroutine method of the wrapped client is awaited only after a token
+    has been taken from `bucket`, other attributes are passed through as is.
+    Concurrent calls with the same method and arguments share one request.
+
+    Args:
+        client: AniList client instance
+        bucket (TokenBucket): Shared token bucket
+
+    Attributes:
+        bucket (TokenBucket): Shared token bucket
+        flight (SingleFlight): In-flight requests, `flight.shared` counts the
+            requests that were saved
+    """
+
+    def __init__(self, client: Any, bucket: TokenBucket) -> None:
+        self._client = client
+        self.bucket = bucket
+        self.flight = SingleFlight()
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._client, name)
+
+        if not asyncio.iscoroutinefunction(attr):
+            return attr
+
+        async def request(*args, **kwargs):
+            await self.bucket.acquire()
+
+            try:
+                return await attr(*args, **kwargs)
+            except Exception as e:
+                # the client does not expose response headers
+                if "429" in str(e) or "too many requests" in str(e).lower():
+                    self.bucket.update(429, {})
+                raise
+
+        @functools.wraps(attr)
+        async def wrapper(*args, **kwargs):
+            key = request_key(name, args, kwargs)
+            if key is None:
+                return await request(*args, **kwargs)
+
+            return await self.flight.do(key, request, *args, **kwargs)
+
+        return wrapper
+
+    async def query(
+        self, query: str, partial: bool = False, **variables
+    ) -> Optional[dict]:
+        """Sends a raw GraphQL query to AniList.
+
+        The response headers are fed back into the bucket, requests that hit
+        the rate limit are sent again once the backoff is over. Concurrent
+        identical queries share one request.
+
+        Args:
+            query (str): GraphQL query
+            partial (bool): Return the data of a response that also has errors,
+                e.g. a batch of aliased queries. Defaults to False.
+            **variables: Query variables
+
+        Returns:
+            Optional[dict]: `data` field of the response or None on failure
+        """
+
+        key = request_key(query, (partial,), variables)
+        if key is None:
+            return await self._query(query, partial, **variables)
+
+        return await self.flight.do(key, self._query, query, partial, **variables)
+
+    async def _query(
+        self, query: str, partial: bool = False, **variables
+    ) -> Optional[dict]:
+        for _ in range(3):
+            await self.bucket.acquire()
+
+            try:
+                async with get_session().post(
+                    ANILIST_URL,
+                    json={"query": query, "variables": variables},
+                    headers={"Accept": "application/json"},
+                ) as response:
+                    self.bucket.update(response.status, response.headers)
+
+                    if response.status == 429:
+                        continue
+
+                    payload = await response.json()
+            except Exception as e:
+                logger.debug(f"AniList query failed: {e}")
+                return None
+
+            if partial and payload.get("data"):
+                return payload["data"]
+
+            if response.status != 200 or payload.get("errors"):
+                logger.debug(
+                    f"AniList query failed: {response.status} {payload.get('errors')}"
+                )
+                return None
+
+            return payload.get("data")
+
+        return None
@@ -0,0 +1,250 @@
+import asyncio
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from loguru import logger
+
+ACTIVITY_TYPES = ("ANIME_LIST", "MANGA_LIST", "TEXT", "MESSAGE")
+
+STREAM_QUERY = """
+query ($users: [Int], $cursor: Int, $page: Int) {
+  Page(page: $page, perPage: 50) {
+    pageInfo { hasNextPage }
+    activities(userId_in: $users, id_greater: $cursor, sort: ID) {
+      ... on ListActivity { id type userId }
+      ... on TextActivity { id type userId }
+      ... on MessageActivity { id type recipientId }
+    }
+  }
+}
+"""
+
+CURSOR_QUERY = """
+query ($users: [Int]) {
+  Page(page: 1, perPage: 1) {
+    activities(userId_in: $users, sort: ID_DESC) {
+      ... on ListActivity { id }
+      ... on TextActivity { id }
+      ... on MessageActivity { id }
+    }
+  }
+}
+"""
+
+USER_QUERY = """
+query ($user: Int, $types: [ActivityType], $after: Int, $perPage: Int) {
+  Page(page: 1, perPage: $perPage) {
+    activities(userId: $user, type_in: $types, id_greater: $after, sort: ID_DESC) {
+      ... on ListActivity { id type }
+      ... on TextActivity { id type }
+      ... on MessageActivity { id type }
+    }
+  }
+}
+"""
+
+
+class ActivityStream:
+    """Polls the activities of many users with a single query per chunk.
+
+    Tracked user ids are split into chunks, every chunk keeps the highest
+    activity id it has seen and only asks AniList for newer activities.
+
+    Args:
+        chunk_size (int): Maximum amount of user ids per query
+        max_pages (int): Maximum amount of pages fetched per chunk and poll
+
+    Attributes:
+        chunk_size (int): Maximum amount of user ids per query
+        max_pages (int): Maximum amount of pages fetched per chunk and poll
+        chunks (List[Tuple[int, ...]]): Sorted user ids of every chunk
+        cursors (Dict[Tuple[int, ...], int]): Highest activity id seen per chunk
+    """
+
+    def __init__(self, chunk_size: int = 50, max_pages: int = 5) -> None:
+        self.chunk_size = max(1, chunk_size)
+        self.max_pages = max(1, max_pages)
+
+        self.chunks: List[Tuple[int, ...]] = []
+        self.cursors: Dict[Tuple[int, ...], int] = {}
+
+        self._user_cursors: Dict[int, int] = {}
+
+    def _rebuild(self, users: Iterable[int]) -> None:
+        users = sorted(set(users))
+        chunks = [
+            tuple(users[i : i + self.chunk_size])
+            for i in range(0, len(users), self.chunk_size)
+        ]
+
+        if chunks == self.chunks:
+            return
+
+        cursors = {}
+        for chunk in chunks:
+            known = [self._user_cursors[u] for u in chunk if u in self._user_cursors]
+
+            # new users are fetched in full on their first cycle anyway
+            if chunk in self.cursors:
+                cursors[chunk] = self.cursors[chunk]
+            elif known:
+                cursors[chunk] = min(known)
+
+        self.chunks = chunks
+        self.cursors = cursors
+
+    @staticmethod
+    def _failed(chunk: Tuple[int, ...]) -> Dict[int, Dict[str, int]]:
+        return {user: {t: -1 for t in ACTIVITY_TYPES} for user in chunk}
+
+    async def _poll_chunk(
+        self, client, chunk: Tuple[int, ...]
+    ) -> Dict[int, Dict[str, int]]:
+        changed: Dict[int, Dict[str, int]] = {}
+
+        if chunk not in self.cursors:
+            data = await client.query(CURSOR_QUERY, users=list(chunk))
+            if data is None:
+                return self._failed(chunk)
+
+            activities = data["Page"]["activities"]
+            self._advance(chunk, activities[0]["id"] if activities else 0)
+            return changed
+
+        # every page is requested with the same cursor, it only moves at the end
+        cursor = self.cursors[chunk]
+        newest_id = cursor
+
+        for page in range(1, self.max_pages + 1):
+            data = await client.query(
+                STREAM_QUERY, users=list(chunk), cursor=cursor, page=page
+            )
+            if data is None:
+                return self._failed(chunk)
+
+            activities = [a for a in data["Page"]["activities"] if a]
+            for activity in activities:
+                user = activity.get("userId") or activity.get("recipientId")
+                newest = changed.setdefault(user, {})
+                newest[activity["type"]] = max(
+                    activity["id"], newest.get(activity["type"], 0)
+                )
+
+            if activities:
+                newest_id = max(newest_id, max(a["id"] for a in activities))
+
+            if not data["Page"]["pageInfo"]["hasNextPage"]:
+                break
+
+        self._advance(chunk, newest_id)
+        return changed
+
+    def seed(self, user: int, cursor: int) -> None:
+        """Sets a known cursor for a user, e.g. a restored feed watermark.
+
+        Args:
+            user (int): User id
+            cursor (int): Activity id that the user's feeds have seen
+        """
+
+        self._user_cursors[user] = min(cursor, self._user_cursors.get(user, cursor))
+
+    def _advance(self, chunk: Tuple[int, ...], cursor: int) -> None:
+        self.cursors[chunk] = max(cursor, self.cursors.get(chunk, 0))
+
+        for user in chunk:
+            self._user_cursors[user] = self.cursors[chunk]
+
+    async def poll(
+        self, client, users: Iterable[int], due: Set[int] = None
+    ) -> Dict[int, Dict[str, int]]:
+        """Returns the newest activity id per type of users with new activities.
+
+        The cursors move past the reported activities, so they are only
+        reported once. Users of chunks that could not be fetched are reported
+        with -1 for every type, their cursor stays in place.
+
+        Args:
+            client (RateLimitedClient): AniList client
+            users (Iterable[int]): Tracked user ids
+            due (Set[int]): Only poll chunks that contain one of these user ids.
+                Defaults to every chunk.
+
+        Returns:
+            Dict[int, Dict[str, int]]: Newest activity id per AniList activity type and user id
+        """
+
+        self._rebuild(users)
+
+        chunks = [
+            chunk
+            for chunk in self.chunks
+            if due is None or any(user in due for user in chunk)
+        ]
+
+        results = await asyncio.gather(
+            *(self._poll_chunk(client, chunk) for chunk in chunks),
+            return_exceptions=True,
+        )
+
+        changed: Dict[int, Dict[str, int]] = {}
+        for chunk, result in zip(chunks, results):
+            if isinstance(result, Exception):
+                logger.debug(f"Could not poll activity stream: {result}")
+                result = self._failed(chunk)
+
+            for user, newest in result.items():
+                merged = changed.setdefault(user, {})
+                for t, i in newest.items():
+                    j = merged.get(t, 0)
+                    merged[t] = -1 if i < 0 or j < 0 else max(i, j)
+
+        return changed
+
+    async def probe(
+        self,
+        client,
+        user: int,
+        types: Iterable[str],
+        after: int = 0,
+        per_page: int = 25,
+    ) -> Optional[Dict[str, int]]:
+        """Returns the newest activity id per type of a single user.
+
+        List, text and message activities are covered by the same request and
+        only activities newer than `after` are requested, so the response is
+        empty as long as the user has not posted anything new. Types that do
+        not show up on a full page are reported with -1, as their newest
+        activity might be on a later page.
+
+        Args:
+            client (RateLimitedClient): AniList client
+            user (int): User id
+            types (Iterable[str]): AniList activity types to look for
+            after (int): Activity id watermark. Defaults to 0.
+            per_page (int): Amount of activities to request. Defaults to 25.
+
+        Returns:
+            Optional[Dict[str, int]]: Newest activity id per type or None on failure
+        """
+
+        types = list(types)
+
+        data = await client.query(
+            USER_QUERY, user=user, types=types, after=after or None, perPage=per_page
+        )
+        if data is None:
+            return None
+
+        activities = [a for a in data["Page"]["activities"] if a]
+
+        newest: Dict[str, int] = {}
+        for activity in activities:
+            newest[activity["type"]] = max(
+                activity["id"], newest.get(activity["type"], 0)
+            )
+
+        if len(activities) >= per_page:
+            for t in types:
+                newest.setdefault(t, -1)
+
+        return newest
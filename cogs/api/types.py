@@ -1,14 +1,18 @@
 # discord imports
 import discord
-import asyncio
 
 # utilities
+import math
 import re
-from PIL import Image
-import urllib.request, io
+import aiohttp
+from collections import Counter
 from typing import Optional, Tuple, Union
 from ..utils import *
 from .database import database
+from .cache import TTLCache, profiles, list_items, picture_colors
+from .image import dominant_color_async
+from .media import MediaRecord, media_cache
+from ..http import get_session
 
 # anilist
 from anilist import AsyncClient
@@ -30,6 +34,102 @@ from anilist.types import (
 )
 
 
+# rendered stats fields per media and record version
+_media_stats = TTLCache(1024, 86400)
+
+
+def media_stats(record: MediaRecord) -> str:
+    """Returns the text of the stats field of a media embed.
+
+    The text is rendered once per media and fetched record, every embed for
+    the same title reuses it until the record is refreshed.
+
+    Args:
+        record (MediaRecord): Media record
+
+    Returns:
+        str: Field text
+    """
+
+    key = (record.type, record.id, record.fetched)
+
+    text = _media_stats.get(key)
+    if text is None:
+        text = _render_media_stats(record)
+        _media_stats.set(key, text)
+
+    return text
+
+
+def _render_media_stats(record: MediaRecord) -> str:
+    text = ""
+
+    if record.start_date:
+        if record.end_date:
+            text += (
+                f"{'Released' if record.is_manga else 'Aired'}"
+                f" <t:{record.start_date}:D> to <t:{record.end_date}:D>\n"
+            )
+        elif record.is_manga:
+            text += f"Releasing since <t:{record.start_date}:R>\n"
+        else:
+            text += f"Airing since <t:{record.start_date}:R>\n"
+
+            if record.next_airing_at:
+                text += f"Next episode: <t:{record.next_airing_at}:R> (Episode {record.next_airing_episode})\n"
+
+    if not record.is_manga:
+        if record.season_name and record.season_year:
+            text += f"Premiered {record.season_name.title()} {record.season_year}\n"
+        else:
+            text += "Not Premiered Yet\n"
+
+    if record.score is not None:
+        text += f"> Score ⭐: `{string(record.score)}`\n"
+
+    if record.ranking:
+        rank, format, year, all_time = record.ranking
+        text += f"> Rank 📈: `#{string(rank)} on {format} ({str(year) if not all_time else 'All time'})`\n"
+
+    if record.popularity is not None:
+        text += f"> Popularity 📈: `#{string(record.popularity)}`\n"
+
+    text += f"Description 📔: \n> {string(truncate_html(record.description or ''))}"
+
+    return text
+
+
+async def media_embed(
+    record: MediaRecord,
+    channel: discord.TextChannel = None,
+    filter_adult: bool = True,
+) -> Optional[discord.Embed]:
+    embed = discord.Embed(
+        title=record.title_romaji,
+        url=record.url,
+        description=record.title_english or record.title_native,
+        color=color_main,
+    )
+
+    embed.add_field(
+        name="Stats 🧮",
+        value=media_stats(record),
+        inline=False,
+    )
+    if record.is_adult and filter_adult:
+        embed.set_image(url=f"https://mitsu.0x16c3.com/filter/media/{record.id}")
+    else:
+        embed.set_image(url=f"https://img.anili.st/media/{record.id}")
+
+    if channel:
+        try:
+            await channel.send(embed=embed)
+        except Exception as e:
+            logger.info(f"Cannot send message -> {str(channel.id)} : {record.id} {e}")
+    else:
+        return embed
+
+
 class CAnime(Anime):
     def create(obj: Anime) -> "CAnime":
         obj.__class__ = CAnime
@@ -38,76 +138,7 @@ class CAnime(Anime):
     async def send_embed(
         self, channel: discord.TextChannel = None, filter_adult: bool = True
     ) -> Optional[discord.Embed]:
-        embed = discord.Embed(
-            title=self.title.romaji,
-            url=self.url,
-            description=self.title.english
-            if hasattr(self.title, "english")
-            else self.title.native,
-            color=color_main,
-        )
-
-        ranking = None
-        if hasattr(self, "rankings"):
-            ranking = self.rankings[0]
-        embed.add_field(
-            name="Stats 🧮",
-            value=(
-                (
-                    (
-                        f"Aired <t:{self.start_date.get_timestamp()}:D> to <t:{self.end_date.get_timestamp()}:D>\n"
-                        if hasattr(self, "end_date")
-                        and self.end_date.get_timestamp() != -1
-                        else (
-                            f"Airing since <t:{self.start_date.get_timestamp()}:R>\n"
-                            + (
-                                f"Next episode: <t:{self.next_airing.at.get_timestamp()}:R> (Episode {self.next_airing.episode})\n"
-                                if hasattr(self, "next_airing")
-                                else ""
-                            )
-                        )
-                    )
-                    if hasattr(self, "start_date")
-                    else ""
-                )
-                + (
-                    f"Premiered {self.season.name.title()} {self.season.year}\n"
-                    if hasattr(self, "season")
-                    and hasattr(self.season, "name")
-                    and hasattr(self.season, "year")
-                    else "Not Premiered Yet\n"
-                )
-                + (
-                    f"> Score ⭐: `{string(self.score.mean)}`\n"
-                    if hasattr(self.score, "mean")
-                    else ""
-                )
-                + (
-                    f"> Rank 📈: `#{string(ranking.rank)} on {ranking.format} ({str(ranking.year) if not ranking.all_time else 'All time'})`\n"
-                    if ranking
-                    else ""
-                )
-                + (
-                    f"> Popularity 📈: `#{string(self.popularity)}`\n"
-                    if hasattr(self, "popularity")
-                    else ""
-                )
-                + f"Description 📔: \n> {string(strip_tags(self.description[:128])) + ('...' if len(string(strip_tags(self.description))) > 128 else '')}"
-            ),
-            inline=False,
-        )
-        if (hasattr(self, "is_adult") and self.is_adult) and filter_adult:
-            embed.set_image(url=f"https://mitsu.0x16c3.com/filter/media/{self.id}")
-        else:
-            embed.set_image(url=f"https://img.anili.st/media/{self.id}")
-
-        if channel:
-            try:
-                await channel.send(embed=embed)
-            except Exception as e:
-                logger.info(f"Cannot send message -> {str(channel.id)} : {self.id} {e}")
-        else:
-            return embed
+        return await media_embed(media_cache.put(self), channel, filter_adult)
 
 
 class CManga(Manga):
@@ -118,62 +149,7 @@ class CManga(Manga):
     async def send_embed(
         self, channel: discord.TextChannel = None, filter_adult: bool = True
     ) -> Optional[discord.Embed]:
-        embed = discord.Embed(
-            title=self.title.romaji,
-            url=self.url,
-            description=self.title.english
-            if hasattr(self.title, "english")
-            else self.title.native,
-            color=color_main,
-        )
-
-        ranking = None
-        if hasattr(self, "rankings"):
-            ranking = self.rankings[0]
-        embed.add_field(
-            name="Stats 🧮",
-            value=(
-                (
-                    (
-                        f"Released <t:{self.start_date.get_timestamp()}:D> to <t:{self.end_date.get_timestamp()}:D>\n"
-                        if hasattr(self, "end_date")
-                        and self.end_date.get_timestamp() != -1
-                        else f"Releasing since <t:{self.start_date.get_timestamp()}:R>\n"
-                    )
-                    if hasattr(self, "start_date")
-                    else ""
-                )
-                + (
-                    f"> Score ⭐: `{string(self.score.mean)}`\n"
-                    if hasattr(self.score, "mean")
-                    else ""
-                )
-                + (
-                    f"> Rank 📈: `#{string(ranking.rank)} on {ranking.format} ({str(ranking.year) if not ranking.all_time else 'All time'})`\n"
-                    if ranking
-                    else ""
-                )
-                + (
-                    f"> Popularity 📈: `#{string(self.popularity)}`\n"
-                    if hasattr(self, "popularity")
-                    else ""
-                )
-                + f"Description 📔: \n> {string(strip_tags(self.description[:128])) + ('...' if len(string(strip_tags(self.description))) > 128 else '')}"
-            ),
-            inline=False,
-        )
-        if (hasattr(self, "is_adult") and self.is_adult) and filter_adult:
-            embed.set_image(url=f"https://mitsu.0x16c3.com/filter/media/{self.id}")
-        else:
-            embed.set_image(url=f"https://img.anili.st/media/{self.id}")
-
-        if channel:
-            try:
-                await channel.send(embed=embed)
-            except Exception as e:
-                logger.info(f"Cannot send message -> {str(channel.id)} : {self.id} {e}")
-        else:
-            return embed
+        return await media_embed(media_cache.put(self), channel, filter_adult)
 
 
 class CCharacter(Character):
@@ -215,6 +191,10 @@ class CCharacter(Character):
             return embed
 
 
+# largest profile picture that is downloaded, in bytes
+PICTURE_MAX_SIZE = 2 * 1024 * 1024
+
+
 class CUser(User):
     @staticmethod
     def create(obj: User) -> "CUser":
@@ -222,49 +202,49 @@ class CUser(User):
         return obj
 
     def get_color_list(self, amount: int, rotate: int = -75):
-        colors = []
-
-        for step in range(amount):
-            colors.append(rotate_hue(self.profile_color, (step + 1) / amount * -rotate))
-
-        return colors
-
-    def get_picture_color(self) -> int:
-
-        req = urllib.request.Request(
-            self.image.medium,
-            data=None,
-            headers={
-                "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_9_3) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/35.0.1916.47 Safari/537.36"
-            },
-        )
+        return list(color_band(tuple(self.profile_color), amount, rotate))
 
-        path = io.BytesIO(urllib.request.urlopen(req).read())
-        img = Image.open(path)
+    async def get_picture_color(self) -> Optional[Tuple[int, int, int]]:
 
-        unique_colors = set()
-        for i in range(img.size[0]):
-            for j in range(img.size[1]):
-                pixel = img.getpixel((i, j))
-                unique_colors.add(pixel)
+        url = self.image.medium
 
-        colors = img.getcolors(len(unique_colors))
+        color = picture_colors.get(url)
+        if color:
+            return color
 
-        max_occurence, most_present = 0, 0
         try:
-            for c in colors:
-                if c[0] > max_occurence:
-                    (max_occurence, most_present) = c
-            return most_present
+            async with get_session().get(
+                url,
+                headers={
+                    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_9_3) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/35.0.1916.47 Safari/537.36"
+                },
+                timeout=aiohttp.ClientTimeout(total=10),
+            ) as response:
+                if response.status != 200:
+                    return None
+
+                data = bytearray()
+                async for chunk in response.content.iter_chunked(65536):
+                    data += chunk
+
+                    if len(data) > PICTURE_MAX_SIZE:
+                        logger.debug(f"Profile picture too large -> {url}")
+                        return None
+
+            color = await dominant_color_async(bytes(data))
         except Exception as e:
             logger.debug(str(e))
+            return None
+
+        if color:
+            picture_colors.set(url, color)
+
+        return color
 
     async def send_embed(
         self, channel: discord.TextChannel = None, **kwargs
     ) -> Optional[discord.Embed]:
-        loop = asyncio.get_event_loop()
-
-        estimate = await loop.run_in_executor(None, self.get_picture_color)
+        estimate = await self.get_picture_color() or []
         if isinstance(estimate, int):
             estimate = [estimate, estimate, estimate]
 
@@ -319,12 +299,30 @@ class CUser(User):
             return embed
 
 
+# list activity status -> channel filter that blocks it
+LIST_STATUS_FILTERS = {
+    "WATCHED EPISODE": "progress",
+    "REWATCHED EPISODE": "progress",
+    "READ CHAPTER": "progress",
+    "REREAD CHAPTER": "progress",
+    "COMPLETED": "completion",
+    "PLANS TO WATCH": "planning",
+    "PLANS TO READ": "planning",
+    "DROPPED": "dropped",
+    "PAUSED WATCHING": "paused",
+    "PAUSED READING": "paused",
+}
+
+
 class CListActivity(ListActivity):
 
     username = None
     userid = None
     sent_message = None
 
+    # activities skipped by channel filters per channel id
+    skipped = Counter()
+
     @staticmethod
     def create(obj: ListActivity, username: str = None, userid: int = None) -> "CListActivity":
         obj.__class__ = CListActivity
@@ -342,26 +340,43 @@ class CListActivity(ListActivity):
     @staticmethod
     def get_score_color(user: CUser, score: int) -> Tuple[int, int, int]:
         amount = 5
-        colors = user.get_color_list(amount)
-        colors.reverse()
+        colors = color_band(tuple(user.profile_color), amount)
+
+        # the band is ordered from the highest to the lowest score
+        if not 0 < score <= 100:
+            return colors[-1]
 
-        delta = 100 / amount
+        return colors[amount - math.ceil(score * amount / 100)]
 
-        for i in range(amount):
-            range_min = 0 + i * delta
-            range_max = range_min + delta
+    @staticmethod
+    def prefilter(item: "CListActivity", ch: Optional[dict]) -> bool:
+        """Checks if a channel could accept an activity from its status alone.
 
-            if in_range(score, range_min, range_max):
-                return colors[i]
+        Activities whose status is not known are always accepted, the exact
+        check against the list entry is done afterwards.
 
-        return colors[0]
+        Args:
+            item (CListActivity): List activity
+            ch (Optional[dict]): Channel filters
+
+        Returns:
+            bool: False if the channel blocks the activity
+        """
+
+        if not ch or not item.status:
+            return True
+
+        block = LIST_STATUS_FILTERS.get(str(getattr(item.status, "string", "")).upper())
+        return not (block and ch.get(f"list_block_{block}"))
 
     async def get_list(self, anilist: AsyncClient) -> MediaList:
 
         if not self.username:
             return None
 
-        listitem = await anilist.get_list_item(self.username, self.media.id)
+        listitem = await list_items.get(
+            anilist, self.username, self.media.id, self.date.get_timestamp()
+        )
         return listitem
 
     @staticmethod
@@ -378,8 +393,14 @@ class CListActivity(ListActivity):
         if activity:
             item_idx = activity.feed.entries.index(item)
 
+        if channel and not CListActivity.prefilter(
+            item, database.channel_filter(channel.id)
+        ):
+            CListActivity.skipped[channel.id] += 1
+            return None
+
         if not user:
-            user = await anilist.get_user(item.user.name)
+            user = await profiles.get(anilist, item.user.name)
 
         if not user:
             return None
@@ -392,11 +413,8 @@ class CListActivity(ListActivity):
         listitem: MediaList
 
         if channel:
-            channels = await database.channel_get()
-            matching = [ch for ch in channels if int(ch["channel"]) == channel.id]
-            if len(matching):
-                ch = matching[0]
-
+            ch = database.channel_filter(channel.id)
+            if ch:
                 # progress
                 if listitem.status in [
                     "CURRENT",
@@ -530,17 +548,9 @@ class CListActivity(ListActivity):
         )
 
         if listitem.status in ["COMPLETED", "PLANNING"]:
-            if is_manga:
-                cobj = CManga.create(item.media)
-            else:
-                cobj = CAnime.create(item.media)
-
-            cobj: Union[CManga, CAnime]
-            stat_embed = await cobj.send_embed()
-
             embed.add_field(
-                name=stat_embed.fields[0].name,
-                value=stat_embed.fields[0].value,
+                name="Stats 🧮",
+                value=media_stats(media_cache.put(item.media)),
                 inline=False,
             )
 
@@ -645,7 +655,8 @@ class CTextActivity(TextActivity):
         if not hasattr(item, "user"):
             return None
 
-        user = await anilist.get_user(item.user.name)
+        if not user or user.name != item.user.name:
+            user = await profiles.get(anilist, item.user.name)
         if not user:
             return None
 
@@ -655,7 +666,7 @@ class CTextActivity(TextActivity):
         if hasattr(item, "recipient"):
             received = True
 
-            recipient = await anilist.get_user(item.recipient.name)
+            recipient = await profiles.get(anilist, item.recipient.name)
             if not recipient:
                 return None
 
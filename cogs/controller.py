@@ -17,10 +17,26 @@ from discord_slash.utils.manage_components import (
 # utilities
 from .utils import *
 from .api.database import database
-from .api.types import CCharacter, CUser, CAnime, CManga, CListActivity, CTextActivity
-from typing import Union
+from .api.cache import profiles
+from .api.media import media_cache
+from .api.pool import WorkerPool
+from .api.stream import ActivityStream
+from .api.types import (
+    CCharacter,
+    CUser,
+    CAnime,
+    CManga,
+    CListActivity,
+    CTextActivity,
+    media_embed,
+)
+from typing import Any, Set, Tuple, Union
 from loguru import logger
+import copy
+import math
+import statistics
 import sys
+import time
 
 
 class Feed:
@@ -40,6 +56,7 @@ class Feed:
     """
 
     TYPE = {"ANIME": 0, "MANGA": 1, "TEXT": 2}
+    ACTIVITY_TYPE = {"ANIME_LIST": 0, "MANGA_LIST": 1, "TEXT": 2, "MESSAGE": 2}
 
     @staticmethod
     def get_type(i: any):
@@ -86,18 +103,119 @@ class Feed:
         self._init = False
         self.reset = False
 
+        self.updated = False
+        self.last_activity = 0
+        self.activity_gap = None
+
+        self.watermark = 0
+        self.watermark_date = 0
+
+        self.processed_ids: List[int] = []
+        self.catchup = False
+        self.dirty = False
+
+    def state(self) -> Dict[str, Any]:
+        """Returns the state that is needed to resume the feed after a restart."""
+
+        return {
+            "watermark": self.watermark,
+            "watermark_date": self.watermark_date,
+            "processed": (
+                [i.id for i in self.entries_processed] + self.processed_ids
+            )[: int(config["MEMORY_LIMIT"])],
+            "last_activity": self.last_activity,
+            "activity_gap": self.activity_gap,
+        }
+
+    def restore(self, state: Dict[str, Any]) -> None:
+        """Resumes the feed from a saved state.
+
+        The feed counts as initialized, so activities newer than the saved
+        watermark are delivered as a catch-up on the next update.
+
+        Args:
+            state (Dict[str, Any]): State returned by `Feed.state`
+        """
+
+        self.watermark = state.get("watermark", 0)
+        self.watermark_date = state.get("watermark_date", 0)
+        self.processed_ids = list(state.get("processed", []))
+        self.last_activity = state.get("last_activity", 0)
+        self.activity_gap = state.get("activity_gap")
+
+        self._init = True
+        self.updated = True
+        self.catchup = True
+
+    @property
+    def tier(self) -> str:
+        """Polling tier based on the observed activity rate.
+
+        Feeds with an activity in the last TIER_HOT hours are hot, feeds with an
+        activity or a median gap between activities within TIER_WARM hours are
+        warm, everything else is cold.
+        """
+
+        idle = time.time() - self.last_activity
+
+        if idle < config.getfloat("TIER_HOT", fallback=6) * 3600:
+            return "HOT"
+
+        warm = config.getfloat("TIER_WARM", fallback=72) * 3600
+        if idle < warm or (self.activity_gap is not None and self.activity_gap < warm):
+            return "WARM"
+
+        return "COLD"
+
+    @property
+    def interval(self) -> int:
+        """Seconds between two polls of this feed."""
+
+        return {
+            "HOT": config.getint("POLL_HOT", fallback=0),
+            "WARM": config.getint("POLL_WARM", fallback=300),
+            "COLD": config.getint("POLL_COLD", fallback=1800),
+        }[self.tier]
+
+    def learn(self, feed: List[Union[CListActivity, CTextActivity]]) -> None:
+        """Updates the observed activity rate from activity timestamps.
+
+        Args:
+            feed (List[Union[CListActivity, CTextActivity]]): Latest activity feed from AniList
+        """
+
+        timestamps = sorted(
+            (item.date.get_timestamp() for item in feed if hasattr(item, "date")),
+            reverse=True,
+        )
+        if not len(timestamps):
+            return
+
+        self.last_activity = max(self.last_activity, timestamps[0])
+
+        gaps = [a - b for a, b in zip(timestamps, timestamps[1:])]
+        if len(gaps):
+            self.activity_gap = statistics.median(gaps)
+
     @logger.catch
     async def retrieve(
-        self,
-    ) -> Dict[
-        List[Union[CListActivity, CTextActivity]],
-        List[Union[CListActivity, CTextActivity]],
+        self, types: Set[str] = None
+    ) -> Optional[
+        Tuple[
+            List[Union[CListActivity, CTextActivity]],
+            List[Union[CListActivity, CTextActivity]],
+        ]
     ]:
         """Retrieves activity feed from AniList.
 
+        Args:
+            types (Set[str]): AniList activity types to fetch, text feeds skip
+                the text or message request if it is not included. Defaults to all.
+
         Returns:
             List[Union[CListActivity, CTextActivity]],: First int(config["MEMORY_LIMIT"]) activities.
             List[Union[CListActivity, CTextActivity]]]: Entire activity list.
+            None if the feed could not be fetched, unlike an empty feed.
         """
 
         while True:
@@ -105,14 +223,18 @@ class Feed:
                 # check if self.arguments is None
                 if not self.arguments:
                     logger.error("Arguments for feed are None")
-                    return [], []
+                    return None
+
+                is_text = self.feed == self.TYPE["TEXT"]
 
-                ret = await self.function(**self.arguments)
+                ret = []
+                if not types or not is_text or "TEXT" in types:
+                    ret = await self.function(**self.arguments)
 
                 if not isinstance(ret, list):
                     ret = []
 
-                if self.feed == self.TYPE["TEXT"]:
+                if is_text and (not types or "MESSAGE" in types):
                     msg = await anilist.get_activity(
                         id=self.userid, content_type="message"
                     )
@@ -133,9 +255,13 @@ class Feed:
                 self.errors += 1
                 if self.errors > 3:
                     logger.error("Too many errors on " + self.username)
-                    return [], []
+                    return None
 
-                await asyncio.sleep(5)
+                # retry on the next cycle instead of adding to a 429 storm
+                if anilist.bucket.throttled:
+                    return None
+
+                await asyncio.sleep(5 * 2 ** (self.errors - 1))
 
         return res[: int(config["MEMORY_LIMIT"])], res
 
@@ -147,6 +273,9 @@ class Feed:
             feed (List[Union[CListActivity, CTextActivity]]): Latest activity feed from AniList
         """
 
+        self.updated = True
+        self.learn(feed)
+
         if not self._init or self.reset:
             if not len(feed):
                 logger.debug("Empty feed " + str(self))
@@ -164,10 +293,16 @@ class Feed:
 
             self._init = True
             self.reset = False
+            self.advance(feed)
             return
 
+        # everything up to the watermark has been processed or skipped before
+        feed = [item for item in feed if item.id > self.watermark]
+        processed = {i.id for i in self.entries_processed}
+        processed.update(self.processed_ids)
+
         for item in feed:
-            if item.id in (i.id for i in self.entries_processed):
+            if item.id in processed:
                 continue
 
             if self.type == CListActivity:
@@ -182,7 +317,10 @@ class Feed:
                     if item.date.timestamp < first_occurence.date.timestamp:
                         continue
 
-                if item.date.timestamp < self.entries_processed[-1].date.timestamp:
+                if (
+                    len(self.entries_processed)
+                    and item.date.timestamp < self.entries_processed[-1].date.timestamp
+                ):
                     continue
 
             self.entries.insert(0, item)
@@ -190,6 +328,21 @@ class Feed:
 
             logger.info("Added " + str(item.id))
 
+        self.advance(feed)
+
+    def advance(self, feed: List[Union[CListActivity, CTextActivity]]) -> None:
+        """Moves the watermark to the newest activity of the feed.
+
+        Args:
+            feed (List[Union[CListActivity, CTextActivity]]): Activities that have been seen
+        """
+
+        for item in feed:
+            if item.id > self.watermark:
+                self.watermark = item.id
+                self.watermark_date = item.date.get_timestamp()
+                self.dirty = True
+
     async def move_item(self, item, func=None, **kwargs) -> bool:
         """Runs function on item if provided and flags it as processed.
 
@@ -242,6 +395,7 @@ class Feed:
             ]
 
             processed = True
+            self.dirty = True
 
         return processed
 
@@ -340,7 +494,7 @@ class Activity:
 
         if not profile:
             try:
-                profile = await anilist.get_user(name=username)
+                profile = await profiles.get(anilist, username)
                 profile = CUser.create(profile)
             except:
                 return None
@@ -366,7 +520,11 @@ class Activity:
         if not feed:
             feed = self.feed
 
-        items, items_full = await feed.retrieve()
+        result = await feed.retrieve()
+        if result is None:
+            return [], []
+
+        items, items_full = result
 
         await feed.update(items)
         return items, items_full
@@ -381,11 +539,66 @@ class Activity:
             self.username, str(self.channel.id), str(self.type)
         ) == str(o)
 
+    async def send_catchup(self) -> None:
+        """Sends all pending entries as a single summary and flags them as processed.
+
+        List activities that the channel filters block and adult media in
+        channels that are not NSFW are left out of the summary.
+        """
+
+        items = self.feed.entries[:]
+
+        shown = items
+        if self.feed.type == CListActivity:
+            ch = database.channel_filter(self.channel.id)
+            nsfw = self.channel.is_nsfw()
+
+            shown = [
+                item
+                for item in items
+                if CListActivity.prefilter(item, ch)
+                and (nsfw or not getattr(item.media, "is_adult", False))
+            ]
+
+        lines = []
+        for item in reversed(shown):
+            if self.feed.type == CListActivity:
+                lines.append(
+                    f"[{item.media.title.romaji}]({item.media.url}) - {str(item.status)}"
+                    f" <t:{item.date.get_timestamp()}:R>"
+                )
+            else:
+                lines.append(
+                    f"[New post]({item.url if hasattr(item, 'url') else 'https://anilist.co/'})"
+                    f" <t:{item.date.get_timestamp()}:R>"
+                )
+
+        embed = discord.Embed(
+            title=f"{len(shown)} new {Feed.get_type(self.type).lower()} activities of {self.username}",
+            url=f"https://anilist.co/user/{self.username}/",
+            description="\n".join(lines[:10])
+            + (f"\n...and {len(lines) - 10} more" if len(lines) > 10 else ""),
+            color=color_main,
+        )
+        embed.set_footer(text="Catch-up while Mitsu was offline")
+
+        if len(shown):
+            try:
+                await self.channel.send(embed=embed)
+            except Exception as e:
+                logger.info(
+                    f"Cannot send message -> {str(self.channel.id)} : {self.username} {e}"
+                )
+
+        for item in items:
+            await self.feed.move_item(item)
+
     def JSON(self):
         return json.loads(
             json.dumps(
                 {
                     "username": self.username,
+                    "userid": self.userid,
                     "channel": str(self.channel.id),
                     "type": str(self.type),
                 }
@@ -393,25 +606,191 @@ class Activity:
         )
 
 
+class Subscription:
+    """Shared upstream feed of a single AniList user and feed type.
+
+    The feed is fetched once per cycle and every subscribed Activity gets its
+    own copy of the result, so the processed entries and the channel filters
+    of each channel stay separate.
+
+    Args:
+        username (str): Username of the profile
+        userid (int): User id of the profile
+        t (int): Feed type
+
+    Attributes:
+        feed (Feed): Upstream feed that is used for fetching only
+        activities (List[Activity]): Subscribed activity feeds
+        pending (Set[str]): AniList activity types to fetch in the next poll, empty for all
+        unseen (Dict[str, int]): Newest activity ids per type reported by the
+            activity stream that have not been fetched yet
+        next_poll (float): Monotonic time of the next check for new activities
+    """
+
+    def __init__(self, username: str, userid: int, t: int) -> None:
+        self.feed = Feed(username, userid, t)
+        self.activities: List[Activity] = []
+
+        self.pending: Set[str] = set()
+        self.unseen: Dict[str, int] = {}
+        self.next_poll = 0.0
+
+    @property
+    def interval(self) -> int:
+        """Seconds between two checks, the shortest interval of all channels."""
+        return min((activity.feed.interval for activity in self.activities), default=0)
+
+    @property
+    def due(self) -> bool:
+        """If the subscription should be checked for new activities."""
+        return not self.initialized or time.monotonic() >= self.next_poll
+
+    def schedule(self) -> None:
+        """Schedules the next check based on the current polling tier."""
+        self.next_poll = time.monotonic() + self.interval
+
+    @property
+    def types(self) -> List[str]:
+        """AniList activity types that belong to this feed type."""
+        return [k for k, v in Feed.ACTIVITY_TYPE.items() if v == self.feed.feed]
+
+    @property
+    def watermark(self) -> int:
+        """Newest activity id that every subscribed activity has seen."""
+        return min((activity.feed.watermark for activity in self.activities), default=0)
+
+    def check(self, newest: Dict[str, int]) -> bool:
+        """Compares the newest activity ids of a probe with the watermark.
+
+        Args:
+            newest (Dict[str, int]): Newest activity id per AniList activity type
+
+        Returns:
+            bool: If there are new activities to fetch
+        """
+
+        self.pending = {
+            t
+            for t, i in newest.items()
+            if t in self.types and (i < 0 or i > self.watermark)
+        }
+
+        return bool(self.pending)
+
+    def report(self, newest: Dict[str, int]) -> bool:
+        """Remembers new activities from the activity stream and checks them.
+
+        The stream reports every activity only once, so reported ids are kept
+        until they have been fetched or the watermark has passed them.
+
+        Args:
+            newest (Dict[str, int]): Newest activity id per AniList activity type,
+                -1 if unknown
+
+        Returns:
+            bool: If there are new activities to fetch
+        """
+
+        watermark = self.watermark
+
+        for t, i in newest.items():
+            if t in self.types and i > self.unseen.get(t, 0):
+                self.unseen[t] = i
+
+        self.unseen = {t: i for t, i in self.unseen.items() if i > watermark}
+
+        return self.check({**self.unseen, **{t: i for t, i in newest.items() if i < 0}})
+
+    @property
+    def initialized(self) -> bool:
+        """If every subscribed activity has received its first feed."""
+        return all(activity.feed.updated for activity in self.activities)
+
+    async def poll(self, func) -> None:
+        """Fetches the feed and runs `func` for every subscribed activity.
+
+        Args:
+            func (method): Coroutine that takes an Activity and its copy of the items
+        """
+
+        result = await self.feed.retrieve(self.pending)
+
+        # failed fetches are retried on the next cycle, feeds that have not
+        # been initialized yet stay due until their first fetch succeeds
+        if result is None:
+            self.pending = set()
+            return
+
+        items, _ = result
+
+        for t in self.pending or self.types:
+            self.unseen.pop(t, None)
+
+        self.pending = set()
+
+        # items below the watermark have been seen by every channel already
+        if self.initialized:
+            watermark = self.watermark
+            items = [item for item in items if item.id > watermark]
+
+        await asyncio.gather(
+            *(
+                func(activity, [copy.copy(item) for item in items])
+                for activity in self.activities
+            )
+        )
+
+    def __repr__(self):
+        return "<Subscription: {}:{}:{}>".format(
+            self.feed.username, str(self.feed.feed), len(self.activities)
+        )
+
+
 class Controller(commands.Cog):
     """Dicord cog to control commands and the active feeds.
 
     Attributes:
         client: Discord client instance
         feeds (List[Activity]): Active feeds
+        subscriptions (Dict[Tuple[int, int], Subscription]): Active feeds grouped by user id and type
     """
 
     def __init__(self, client):
         self.client = client
         self.feeds: List[Activity] = []
+        self.subscriptions: Dict[Tuple[int, int], Subscription] = {}
+        self.stream = ActivityStream(config.getint("STREAM_CHUNK", fallback=50))
+        self.pool = WorkerPool(config.getint("POLL_WORKERS", fallback=8), self._poll)
         self.loaded = False
+        self.loading = False
+        self.unresolved: List[Tuple[Dict[str, Any], discord.TextChannel]] = []
+        self.startup_time = None
 
     async def on_ready(self):
-        """Loads saved feeds from the database."""
+        """Loads saved feeds from the database.
+
+        discord.py dispatches `on_ready` again after a reconnect, the feeds are
+        only loaded once.
+        """
+
+        if self.loaded or self.loading:
+            return
 
-        channels = await database.channel_get()
-        for ch in channels:
-            await database.channel_repair(ch["channel"])
+        self.loading = True
+
+        try:
+            await self._load()
+        finally:
+            self.loading = False
+
+    async def _load(self) -> None:
+        """Loads the saved feeds and runs their first cycle."""
+
+        start = time.monotonic()
+
+        await database.migrate()
+        await database.channel_load()
+        await media_cache.load()
 
         items = await database.feed_get()
 
@@ -421,8 +800,16 @@ class Controller(commands.Cog):
 
         error_channel_ids = []
 
-        for i, item in enumerate(items):
-            if item in self.feeds:
+        removed = []
+        loaded = []
+
+        active = {
+            (activity.username, str(activity.channel.id), str(activity.type))
+            for activity in self.feeds
+        }
+
+        for item in items:
+            if (item["username"], str(item["channel"]), str(item["type"])) in active:
                 continue
 
             channel: discord.TextChannel = self.client.get_channel(int(item["channel"]))
@@ -431,7 +818,7 @@ class Controller(commands.Cog):
                 logger.debug(
                     f"Could not load <{item['username']}:{item['channel']}:{item['type']}>"
                 )
-                await database.feed_remove([item])
+                removed.append(item)
                 continue
 
             permissions = channel.permissions_for(channel.guild.me)
@@ -467,57 +854,281 @@ class Controller(commands.Cog):
                 logger.debug(
                     f"Could not load <{item['username']}:{item['channel']}:{item['type']}> - Incorrect permissions"
                 )
-                await database.feed_remove([item])
+                removed.append(item)
                 continue
 
-            user: Activity = await Activity.create(
-                item["username"], channel, int(item["type"])
-            )
+            loaded.append((item, channel))
+
+        if len(removed):
+            await database.feed_remove(removed)
+
+        self.feeds.extend(await self._load_feeds(loaded))
+
+        self._sync_subscriptions()
+        await self.pool.run(await self._due())
+
+        for activity in self.feeds:
+            activity.feed.catchup = False
+
+        await self._save_state()
+
+        self.startup_time = time.monotonic() - start
+
+        logger.info(f"Loaded {len(self.feeds)} in {self.startup_time:.2f}s.")
+        self.loaded = True
+        del error_channel_ids
+
+    async def _load_feeds(
+        self, loaded: List[Tuple[Dict[str, Any], discord.TextChannel]]
+    ) -> List[Activity]:
+        """Creates the activities of saved feeds and restores their state.
+
+        Feeds that were saved before user ids were stored are resolved first.
+        Feeds whose user lookup failed are kept in `unresolved` and retried
+        on the next cycle, feeds of users that do not exist are removed.
+
+        Args:
+            loaded (List[Tuple[Dict[str, Any], discord.TextChannel]]): Saved
+                feeds and their channels
+
+        Returns:
+            List[Activity]: Loaded activities
+        """
 
-            if not user:
+        userids = await self._resolve(
+            list({item["username"] for item, _ in loaded if not item.get("userid")})
+        )
+
+        activities = []
+        removed = []
+        resolved = []
+        self.unresolved = []
+
+        for item, channel in loaded:
+            userid = item.get("userid") or userids.get(item["username"])
+
+            if not userid:
                 logger.debug(
                     f"Could not load <{item['username']}:{item['channel']}:{item['type']}>"
                 )
-                await database.feed_remove([item])
+                if userid is None:
+                    self.unresolved.append((item, channel))
+                else:
+                    removed.append(item)
+                continue
+
+            if not item.get("userid"):
+                resolved.append({**item, "userid": userid})
+
+            activities.append(
+                Activity(
+                    item["username"], int(userid), channel, None, int(item["type"])
+                )
+            )
+
+        if len(removed):
+            await database.feed_remove(removed)
+        if len(resolved):
+            await database.feed_update(resolved)
+
+        states = {
+            (state["username"], str(state["channel"]), str(state["type"])): state
+            for state in await database.state_get()
+        }
+
+        for activity in activities:
+            key = (activity.username, str(activity.channel.id), str(activity.type))
+            if key not in states:
                 continue
 
-            self.feeds.append(user)
+            activity.feed.restore(states[key])
+            if activity.feed.watermark:
+                self.stream.seed(activity.userid, activity.feed.watermark)
+
+        return activities
+
+    async def _resolve(self, usernames: List[str]) -> Dict[str, int]:
+        """Looks up the user ids of many users with batched queries.
+
+        Args:
+            usernames (List[str]): AniList usernames
 
-            # wait 60 seconds after every 90 activity to prevent rate limiting
-            if i % 90 == 0 and i >= 90:
-                logger.debug(f"Waiting 60 seconds.")
-                await asyncio.sleep(60)
+        Returns:
+            Dict[str, int]: User id per username, 0 if the user does not exist.
+                Users whose query failed are left out.
+        """
 
-        if len(items) > 90:
-            logger.info(f"Created Activity objects, waiting 60 seconds to fetch feeds.")
-            await asyncio.sleep(60)
+        userids: Dict[str, int] = {}
 
-        for i, user in enumerate(self.feeds):
-            user: Activity
+        for i in range(0, len(usernames), 25):
+            chunk = usernames[i : i + 25]
 
-            enable_filter = not user.channel.is_nsfw()
+            query = "query ({}) {{ {} }}".format(
+                ", ".join(f"$u{j}: String" for j in range(len(chunk))),
+                " ".join(
+                    f"u{j}: User(name: $u{j}) {{ id }}" for j in range(len(chunk))
+                ),
+            )
 
-            await user.get_feed(user.feed)
-            await user.feed.process_entries(
-                user.feed.type.send_embed,
-                channel=user.channel,
-                anilist=anilist,
-                filter_adult=enable_filter,
-                activity=user,
-                user=user.profile,
+            data = await anilist.query(
+                query, partial=True, **{f"u{j}": name for j, name in enumerate(chunk)}
             )
+            if data is None:
+                continue
 
-            if len(self.feeds) > 27:
-                # wait 60 seconds after every 25 feeds to prevent rate limiting
-                if i % 28 == 0 and i >= 28:
-                    logger.debug(f"Waiting 60 seconds.")
-                    await asyncio.sleep(60)
-            else:
-                await asyncio.sleep(1)
+            for j, name in enumerate(chunk):
+                user = data.get(f"u{j}")
+                userids[name] = user["id"] if user else 0
 
-        logger.info(f"Loaded {len(self.feeds)}.")
-        self.loaded = True
-        del error_channel_ids
+        return userids
+
+    def _sync_subscriptions(self) -> None:
+        """Groups the active feeds by user id and feed type."""
+
+        subscriptions: Dict[Tuple[int, int], Subscription] = {}
+
+        for activity in self.feeds:
+            key = (activity.userid, activity.type)
+
+            if key not in subscriptions:
+                subscription = self.subscriptions.get(key) or Subscription(
+                    activity.username, activity.userid, activity.type
+                )
+                subscription.activities = []
+                subscriptions[key] = subscription
+
+            subscriptions[key].activities.append(activity)
+
+        self.subscriptions = subscriptions
+
+    async def _process(
+        self, activity: Activity, items: List[Union[CListActivity, CTextActivity]]
+    ) -> None:
+        """Processes new items of a single feed.
+
+        Args:
+            activity (Activity): Feed to process
+            items (List[Union[CListActivity, CTextActivity]]): Latest activity feed
+        """
+
+        enable_filter = not activity.channel.is_nsfw()
+
+        await activity.feed.update(items)
+
+        # activities that were posted while the bot was offline
+        if activity.feed.catchup:
+            activity.feed.catchup = False
+
+            if len(activity.feed.entries) > 1:
+                await activity.send_catchup()
+                return
+
+        await activity.feed.process_entries(
+            activity.feed.type.send_embed,
+            channel=activity.channel,
+            anilist=anilist,
+            filter_adult=enable_filter,
+            activity=activity,
+        )
+
+    async def _probe(self, subscriptions: List[Subscription]) -> List[Subscription]:
+        """Checks all feed types of a single user with one request.
+
+        Args:
+            subscriptions (List[Subscription]): Subscriptions of the same user
+
+        Returns:
+            List[Subscription]: Subscriptions with new activities
+        """
+
+        types = [t for subscription in subscriptions for t in subscription.types]
+        newest = await self.stream.probe(
+            anilist,
+            subscriptions[0].feed.userid,
+            types,
+            min(subscription.watermark for subscription in subscriptions),
+            int(config["MEMORY_LIMIT"]),
+        )
+
+        due = []
+        for subscription in subscriptions:
+            subscription.schedule()
+            changed = newest is not None and subscription.check(newest)
+
+            if newest is None or not subscription.initialized:
+                subscription.pending = set()
+                due.append(subscription)
+            elif changed:
+                due.append(subscription)
+
+        return due
+
+    async def _due(self) -> List[Subscription]:
+        """Returns the subscriptions that need to be fetched in this cycle.
+
+        Only users with at least one subscription whose polling tier is due are
+        checked. In stream mode the activity stream of every chunk containing
+        such a user is checked, otherwise every user is probed for all of its
+        feed types at once. Activities reported by the stream stay pending until
+        they have been fetched, so a failed fetch is retried on the next cycle.
+        Subscriptions that have not been initialized yet are always returned.
+        """
+
+        users: Dict[int, List[Subscription]] = {}
+        for (userid, _), subscription in self.subscriptions.items():
+            users.setdefault(userid, []).append(subscription)
+
+        scheduled = {
+            userid
+            for userid, subscriptions in users.items()
+            if any(subscription.due for subscription in subscriptions)
+        }
+
+        if config.get("POLL_MODE", fallback="stream") != "stream":
+            results = await asyncio.gather(
+                *(self._probe(users[userid]) for userid in scheduled)
+            )
+            return [subscription for due in results for subscription in due]
+
+        changed = await self.stream.poll(anilist, users.keys(), scheduled)
+
+        due = []
+        for (userid, t), subscription in self.subscriptions.items():
+            if userid in scheduled:
+                subscription.schedule()
+
+            subscription.report(changed.get(userid, {}))
+
+            if not subscription.initialized:
+                subscription.pending = set()
+                due.append(subscription)
+            elif subscription.pending:
+                due.append(subscription)
+
+        return due
+
+    async def _save_state(self) -> None:
+        """Saves the state of every changed feed to the database."""
+
+        items = []
+        for activity in self.feeds:
+            if not activity.feed.dirty:
+                continue
+
+            activity.feed.dirty = False
+            items.append({**activity.JSON(), **activity.feed.state()})
+
+        if len(items):
+            await database.state_upsert(items)
+
+    async def _poll(self, subscription: Subscription) -> None:
+        """Fetches a shared feed once and processes it in every channel.
+
+        Args:
+            subscription (Subscription): Feed to poll
+        """
+
+        await subscription.poll(self._process)
 
     async def process(self):
         """Processes all feeds with the specified interval in the config file."""
@@ -528,33 +1139,46 @@ class Controller(commands.Cog):
                 await asyncio.sleep(5)
                 continue
 
+            # feeds whose user lookup failed at startup
+            if self.unresolved:
+                self.feeds.extend(await self._load_feeds(self.unresolved))
+
             no_dupes = []
             [no_dupes.append(x) for x in self.feeds if x not in no_dupes]
 
             self.feeds = no_dupes
-
-            for i, activity in enumerate(self.feeds):
-                activity: Activity
-
-                enable_filter = not activity.channel.is_nsfw()
-
-                await activity.get_feed(activity.feed)
-                await activity.feed.process_entries(
-                    activity.feed.type.send_embed,
-                    channel=activity.channel,
-                    anilist=anilist,
-                    filter_adult=enable_filter,
-                    activity=activity,
-                    user=activity.profile,
+            self._sync_subscriptions()
+
+            start = time.monotonic()
+            due = await self._due()
+            await self.pool.run(due)
+            await self._save_state()
+            await media_cache.save()
+            elapsed = time.monotonic() - start
+
+            logger.info(
+                f"Processed {len(self.feeds)} feed{'s' if len(self.feeds) != 1 else ''}"
+                f" ({len(due)} fetched) in {elapsed:.2f}s with {self.pool.workers} worker{'s' if self.pool.workers != 1 else ''}."
+                f" (remaining: {anilist.bucket.remaining}, rate: {anilist.bucket.scale:.2f})"
+            )
+            logger.debug(
+                f"Profile cache: {profiles.hits} hits, {profiles.misses} misses"
+            )
+            logger.debug(
+                f"Coalesced requests: {anilist.flight.shared} saved,"
+                f" {anilist.flight.calls} sent"
+            )
+            logger.debug(
+                f"Media cache: {media_cache.hits} hits, {media_cache.misses} misses"
+            )
+            if CListActivity.skipped:
+                logger.debug(
+                    f"Skipped by channel filters: {dict(CListActivity.skipped)}"
                 )
 
-                if len(self.feeds) > 27:
-                    # wait 60 seconds after every 25 feeds to prevent rate limiting
-                    if i % 28 == 0 and i >= 28:
-                        logger.debug(f"Waiting 60 seconds.")
-                        await asyncio.sleep(60)
-                else:
-                    await asyncio.sleep(1)
+            await asyncio.sleep(
+                max(0, config.getint("INTERVAL", fallback=30) - elapsed)
+            )
 
     @cog_ext.cog_slash(
         name="activity",
@@ -681,7 +1305,7 @@ class Controller(commands.Cog):
             activities_failed = []
 
             try:
-                profile = await anilist.get_user(name=username)
+                profile = await profiles.get(anilist, username)
                 profile = CUser.create(profile)
             except:
                 embed = discord.Embed(
@@ -973,7 +1597,7 @@ class Controller(commands.Cog):
 
                         if not profile:
                             try:
-                                profile = await anilist.get_user(name=username)
+                                profile = await profiles.get(anilist, username)
                                 profile = CUser.create(profile)
                             except:
                                 embed = discord.Embed(
@@ -1052,12 +1676,9 @@ class Controller(commands.Cog):
             )
             return
 
-        channels = await database.channel_get()
-        matching = [
-            channel for channel in channels if int(channel["channel"]) == ctx.channel.id
-        ]
-        if len(matching):
-            current = matching[0]
+        matching = database.channel_filter(ctx.channel.id)
+        if matching:
+            current = dict(matching)
         else:
             current = {
                 "channel": ctx.channel.id,
@@ -1116,13 +1737,7 @@ class Controller(commands.Cog):
                     elif i not in selected and not current[f"list_block_{i}"]:
                         current[f"list_block_{i}"] = True
 
-                channels = await database.channel_get()
-                matching = [
-                    channel
-                    for channel in channels
-                    if int(channel["channel"]) == ctx.channel.id
-                ]
-                if len(matching):
+                if database.channel_filter(ctx.channel.id):
                     await database.channel_update(ctx.channel.id, current)
                 else:
                     await database.channel_insert([current])
@@ -1263,8 +1878,16 @@ class Controller(commands.Cog):
         send_message = not kwargs["send-message"]
         await ctx.defer(hidden=send_message)
 
+        if anilist.bucket.throttled:
+            await ctx.send(
+                "AniList is rate limiting requests, please try again in "
+                f"{math.ceil(anilist.bucket.backoff_remaining)} seconds.",
+                hidden=True,
+            )
+            return
+
         try:
-            profile = await anilist.get_user(name=username)
+            profile = await profiles.get(anilist, username)
             profile = CUser.create(profile)
         except Exception as ex:
             embed = discord.Embed(
@@ -1303,6 +1926,14 @@ class Controller(commands.Cog):
         ],
     )
     async def _search(self, ctx: SlashContext, media: str, query: str) -> CAnime:
+        if anilist.bucket.throttled:
+            await ctx.send(
+                "AniList is rate limiting requests, please try again in "
+                f"{math.ceil(anilist.bucket.backoff_remaining)} seconds.",
+                hidden=True,
+            )
+            return
+
         results: List[Union[CAnime, CManga]] = await anilist.search(
             query, content_type=media, page=1, limit=5, pagination=False
         )
@@ -1364,17 +1995,15 @@ class Controller(commands.Cog):
                 )
 
                 selected: int = int(button_ctx.selected_options[0])
-                selected = await anilist.get(id=selected, content_type=media)
+                enable_filter = not ctx.channel.is_nsfw()
 
-                if media == "anime":
-                    selected: CAnime = CAnime.create(selected)
-                elif media == "manga":
-                    selected: CManga = CManga.create(selected)
-                elif media == "character":
+                if media == "character":
+                    selected = await anilist.get(id=selected, content_type=media)
                     selected: CCharacter = CCharacter.create(selected)
-
-                enable_filter = not ctx.channel.is_nsfw()
-                embed = await selected.send_embed(filter_adult=enable_filter)
+                    embed = await selected.send_embed(filter_adult=enable_filter)
+                else:
+                    selected = await media_cache.get(anilist, media, selected)
+                    embed = await media_embed(selected, filter_adult=enable_filter)
 
                 select = create_select(
                     custom_id="_search1",
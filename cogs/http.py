@@ -1,38 +1,83 @@
 import aiohttp
 import json
 
+# outgoing connections in total and per host, idle connections are kept open
+# for `KEEPALIVE_TIMEOUT` seconds and resolved hosts cached for `DNS_CACHE_TTL`
+CONNECTION_LIMIT = 100
+CONNECTION_LIMIT_PER_HOST = 10
+KEEPALIVE_TIMEOUT = 60
+DNS_CACHE_TTL = 300
+
+_session: aiohttp.ClientSession = None
+
+
+def get_session() -> aiohttp.ClientSession:
+    """Returns the shared client session, creating it on first use."""
+
+    global _session
+
+    if _session is None or _session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=CONNECTION_LIMIT,
+            limit_per_host=CONNECTION_LIMIT_PER_HOST,
+            keepalive_timeout=KEEPALIVE_TIMEOUT,
+            use_dns_cache=True,
+            ttl_dns_cache=DNS_CACHE_TTL,
+        )
+        _session = aiohttp.ClientSession(
+            connector=connector,
+            headers={"Accept-Encoding": "gzip, deflate"},
+            timeout=aiohttp.ClientTimeout(total=30),
+        )
+
+    return _session
+
+
+async def close_session() -> None:
+    """Closes the shared client session and its connections."""
+
+    global _session
+
+    if _session is not None and not _session.closed:
+        await _session.close()
+
+    _session = None
+
 
 class AsyncRequest:
-    def __init__(self, _loop):
+    def __init__(self, _loop=None):
         self.loop = _loop
-        self.session = aiohttp.ClientSession(loop=self.loop)
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        return get_session()
 
     async def _request(self, url: str, **kwargs):
-        async with self.session as session:
-            status_code = -1
-            response = None
-
-            if not "type" in kwargs:
-                kwargs["type"] = "get"
-
-            if not "headers" in kwargs:
-                kwargs["headers"] = {
-                    "User-Agent": "Mozilla/5.0 (Windows NT 6.3; WOW64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/47.0.2526.106 Safari/537.36",
-                    "Content-Type": "application/json;charset=UTF-8",
-                }
-
-            if kwargs["type"].lower() == "get":
-                del kwargs["type"]
-                status_code, response = await self._fetch(session, url, **kwargs)
-
-            elif kwargs["type"].lower() == "post":
-                del kwargs["type"]
-                if "json" in kwargs:
-                    kwargs["data"] = json.dumps(
-                        kwargs.pop("json"), separators=(",", ":"), ensure_ascii=True
-                    )
-
-                status_code, response = await self._send(session, url, **kwargs)
+        session = self.session
+        status_code = -1
+        response = None
+
+        if not "type" in kwargs:
+            kwargs["type"] = "get"
+
+        if not "headers" in kwargs:
+            kwargs["headers"] = {
+                "User-Agent": "Mozilla/5.0 (Windows NT 6.3; WOW64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/47.0.2526.106 Safari/537.36",
+                "Content-Type": "application/json;charset=UTF-8",
+            }
+
+        if kwargs["type"].lower() == "get":
+            del kwargs["type"]
+            status_code, response = await self._fetch(session, url, **kwargs)
+
+        elif kwargs["type"].lower() == "post":
+            del kwargs["type"]
+            if "json" in kwargs:
+                kwargs["data"] = json.dumps(
+                    kwargs.pop("json"), separators=(",", ":"), ensure_ascii=True
+                )
+
+            status_code, response = await self._send(session, url, **kwargs)
 
         if status_code not in [200, 201]:
             return status_code, None
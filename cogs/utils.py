@@ -125,6 +125,56 @@ def strip_tags(html):
     return s.get_data()
 
 
+import functools
+import re
+from html import unescape
+
+# comments and tags that start with a letter, "/" or "!" are markup, a bare
+# "<" is text. a ">" within a comment or a quoted attribute does not end it
+_html_tokens = re.compile(
+    r"<!--[\s\S]*?-->"
+    r"|<[A-Za-z/!](?:[^>\"']|\"[^\"]*\"|'[^']*')*>"
+    r"|&#?\w+;?|[^<&]+|[<&]"
+)
+
+
+@functools.lru_cache(maxsize=1024)
+def truncate_html(text: str, size: int = 128, suffix: str = "...") -> str:
+    """Strips tags, converts entities and truncates to `size` characters.
+
+    The text is scanned once and scanning stops as soon as there are more than
+    `size` characters, results are cached per text.
+
+    Args:
+        text (str): HTML text
+        size (int): Maximum amount of characters. Defaults to 128.
+        suffix (str): Appended if the text was truncated. Defaults to "...".
+
+    Returns:
+        str: Plain text
+    """
+
+    parts = []
+    length = 0
+
+    for match in _html_tokens.finditer(text):
+        token = match.group()
+
+        if len(token) > 1:
+            if token[0] == "<":
+                continue
+            if token[0] == "&":
+                token = unescape(token)
+
+        parts.append(token)
+        length += len(token)
+
+        if length > size:
+            return "".join(parts)[:size] + suffix
+
+    return "".join(parts)
+
+
 import math
 from typing import Tuple
 
@@ -185,6 +235,15 @@ def rotate_hue(color: Tuple[int, int, int], angle) -> Tuple[int, int, int]:
     return hsv_to_rgb(h, s, v)
 
 
+@functools.lru_cache(maxsize=256)
+def color_band(
+    color: Tuple[int, int, int], amount: int, rotate: int = -75
+) -> Tuple[Tuple[int, int, int], ...]:
+    return tuple(
+        rotate_hue(color, (step + 1) / amount * -rotate) for step in range(amount)
+    )
+
+
 """"""
 
 """
@@ -200,6 +259,48 @@ if not os.path.isfile("tmp/config.ini"):
     fp.write("; set this to your test server's id for the commands to update faster.\n")
     fp.write("; you need to have the --debug option.\n")
     fp.write("SLASH_TEST_GUILD = -1\n")
+    fp.write("; number of feeds that are polled concurrently\n")
+    fp.write("POLL_WORKERS = 8\n")
+    fp.write("; minimum amount of seconds between two polling cycles\n")
+    fp.write("INTERVAL = 30\n")
+    fp.write("; AniList requests per minute, see AniList's rate limiting policy.\n")
+    fp.write("RATE_LIMIT = 80\n")
+    fp.write("; amount of requests that can be sent at once after being idle\n")
+    fp.write("RATE_BURST = 10\n")
+    fp.write("; stream: poll the activities of many users with one request per chunk\n")
+    fp.write("; feed: check every user with one request per cycle\n")
+    fp.write("POLL_MODE = stream\n")
+    fp.write("; maximum amount of users per activity stream request\n")
+    fp.write("STREAM_CHUNK = 50\n")
+    fp.write("; feeds with an activity in the last TIER_HOT hours\n")
+    fp.write("; are polled every POLL_HOT seconds\n")
+    fp.write("TIER_HOT = 6\n")
+    fp.write("POLL_HOT = 0\n")
+    fp.write("; feeds with an activity or a median gap between activities\n")
+    fp.write("; within TIER_WARM hours are polled every POLL_WARM seconds\n")
+    fp.write("TIER_WARM = 72\n")
+    fp.write("POLL_WARM = 300\n")
+    fp.write("; every other feed is polled every POLL_COLD seconds\n")
+    fp.write("POLL_COLD = 1800\n")
+    fp.write(
+        "; maximum amount of cached AniList profiles and their lifetime in seconds\n"
+    )
+    fp.write("PROFILE_CACHE_SIZE = 512\n")
+    fp.write("PROFILE_CACHE_TTL = 600\n")
+    fp.write("; maximum amount of cached media list entries\n")
+    fp.write("LIST_CACHE_SIZE = 1024\n")
+    fp.write("; maximum amount of cached profile picture colors\n")
+    fp.write("PICTURE_CACHE_SIZE = 256\n")
+    fp.write("; seconds until a profile picture color is computed again\n")
+    fp.write("PICTURE_CACHE_TTL = 86400\n")
+    fp.write("; maximum amount of anime and manga kept in tmp/media.json\n")
+    fp.write("MEDIA_CACHE_SIZE = 2048\n")
+    fp.write("; sqlite: tmp/mitsu.db, migrated once from tmp/tinydb.json\n")
+    fp.write("; journal: in memory, changes appended to tmp/mitsu.journal\n")
+    fp.write("; tinydb: tmp/tinydb.json\n")
+    fp.write("DATABASE = sqlite\n")
+    fp.write("; journal size in bytes after which a new snapshot is written\n")
+    fp.write("JOURNAL_COMPACT_SIZE = 1048576\n")
     fp.close()
 
 cfgparser.read("tmp/config.ini", encoding="utf-8-sig")
@@ -208,6 +309,16 @@ config = cfgparser["DEFAULT"]
 logger.info(
     f"LOADED CONFIG:\n"
     f'  MEMORY_LIMIT = {config["MEMORY_LIMIT"]}\n'
+    f'  POLL_WORKERS = {config.getint("POLL_WORKERS", fallback=8)}\n'
+    f'  INTERVAL = {config.getint("INTERVAL", fallback=30)}\n'
+    f'  RATE_LIMIT = {config.getint("RATE_LIMIT", fallback=80)}\n'
+    f'  RATE_BURST = {config.getint("RATE_BURST", fallback=10)}\n'
+    f'  POLL_MODE = {config.get("POLL_MODE", fallback="stream")}\n'
+    f'  STREAM_CHUNK = {config.getint("STREAM_CHUNK", fallback=50)}\n'
+    f'  DATABASE = {config.get("DATABASE", fallback="sqlite")}\n'
+    f'  POLL_HOT/WARM/COLD = {config.getint("POLL_HOT", fallback=0)}'
+    f'/{config.getint("POLL_WARM", fallback=300)}'
+    f'/{config.getint("POLL_COLD", fallback=1800)}\n'
 )
 
 
@@ -231,5 +342,13 @@ def get_debug_guild_id() -> Optional[List[int]]:
 """
     JIKAN
 """
-anilist = anilist.AsyncClient()
+from .api.ratelimit import TokenBucket, RateLimitedClient
+
+anilist = RateLimitedClient(
+    anilist.AsyncClient(),
+    TokenBucket(
+        config.getint("RATE_LIMIT", fallback=80),
+        config.getint("RATE_BURST", fallback=10),
+    ),
+)
 """"""
@@ -12,6 +12,9 @@ from cogs.client import client
 from cogs.controller import Controller
 from cogs.utils import *
 from cogs.api.database import database
+from cogs.api.media import media_cache
+from cogs.api import image
+from cogs.http import close_session
 
 from loguru import logger
 
@@ -165,9 +168,35 @@ async def update_roles(minutes: int):
         logger.debug("Synced commands")
 
 
+tasks = []
+
+
+async def shutdown():
+    await client.close()
+
+    # stop the running cycle before its database and session are closed
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    # keep the watermarks of the last cycle
+    try:
+        await client.get_cog("Controller")._save_state()
+        await media_cache.save()
+    except Exception as e:
+        logger.error(f"Could not save state on shutdown: {e}")
+
+    await database.close()
+    await close_session()
+    image.shutdown()
+
+
 try:
-    client.loop.create_task(client.get_cog("Controller").process())
-    client.loop.create_task(update_roles(minutes=3))
-    client.run(TOKEN)
+    tasks.append(client.loop.create_task(client.get_cog("Controller").process()))
+    tasks.append(client.loop.create_task(update_roles(minutes=3)))
+    client.loop.run_until_complete(client.start(TOKEN))
 except KeyboardInterrupt:
     print("exit")
+finally:
+    client.loop.run_until_complete(shutdown())
+    client.loop.close()